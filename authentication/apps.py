@@ -1,6 +1,28 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_save, post_save, pre_delete, m2m_changed
 
 
 class AuthenticationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
+
+    def ready(self):
+        from .search import create_search_indexes
+        from .backends import install_token_backend
+        from .keyring import preload_keyring
+        from .blacklist import on_token_blacklisted
+        from .claims import on_permisos_changed, on_permisos_deleted, on_usuario_pre_save, on_usuario_post_save
+        from .models import Usuario
+        from django.contrib.auth.models import Group, Permission
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+        post_migrate.connect(create_search_indexes, sender=self)
+        post_save.connect(on_token_blacklisted, sender=BlacklistedToken)
+        # versión de permisos (authentication.claims): sin JWT_PERMISSION_CLAIMS los receptores no consultan nada
+        for through in (Usuario.user_permissions.through, Usuario.groups.through, Group.permissions.through):
+            m2m_changed.connect(on_permisos_changed, sender=through)
+        for model in (Group, Permission):
+            pre_delete.connect(on_permisos_deleted, sender=model)
+        pre_save.connect(on_usuario_pre_save, sender=Usuario)
+        post_save.connect(on_usuario_post_save, sender=Usuario)
+        install_token_backend()
+        preload_keyring()
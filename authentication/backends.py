@@ -0,0 +1,229 @@
+import hashlib
+import time
+import jwt
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+from django.core.signals import setting_changed
+from django.utils.encoding import force_bytes
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenBackendError, \
+    TokenBackendExpiredToken
+from rest_framework_simplejwt.settings import api_settings
+from .hashing import get_check_password_pool, verify_password
+from .keyring import get_keyring, KeyRingError
+from .claims import PERMISOS_CLAIM, VERSION_CLAIM, get_permisos_version, permisos_from_claim
+from .lru import LRUCache
+
+# estado (is_active, is_staff) por id de usuario, en memoria del proceso
+usuarios_activos = LRUCache(max_entries=settings.JWT_ACTIVE_CACHE_MAX_ENTRIES)
+
+# claims de tokens ya verificados, por hash del token, hasta su vencimiento (JWT_VERIFIED_CACHE_ENABLED)
+tokens_verificados = LRUCache(max_entries=settings.JWT_VERIFIED_CACHE_MAX_ENTRIES)
+
+
+def invalidate_usuario_activo(id: int):
+    # el claim user_id puede ser int o str según la versión de simplejwt
+    usuarios_activos.delete(str(id))
+
+
+class UsuarioJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication con un modo sin estado (JWT_STATELESS_AUTH).
+
+    En modo sin estado el usuario se arma con los claims del token ya verificado (TokenUser), sin cargar
+    el Usuario de la base de datos. Si JWT_ACTIVE_CACHE_TTL es mayor a 0, además se verifica is_active
+    y se toma is_staff (no el del token) de un cache en memoria con ese vencimiento, por lo que solo se
+    consulta la base al vencer la entrada.
+
+    Con JWT_PERMISSION_CLAIMS los permisos salen del token, y el token se rechaza si su versión de
+    permisos no es la actual del usuario.
+    """
+
+    def get_user(self, validated_token):
+        if not settings.JWT_STATELESS_AUTH:
+            user = super().get_user(validated_token)
+            if settings.JWT_PERMISSION_CLAIMS and VERSION_CLAIM in validated_token:
+                self._check_permisos_version(validated_token, user.permisos_version)
+                # ModelBackend usa _perm_cache si existe: has_perm no consulta la base de datos
+                user._perm_cache = set(permisos_from_claim(validated_token[PERMISOS_CLAIM]))
+            return user
+
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = api_settings.TOKEN_USER_CLASS(validated_token)
+
+        if settings.JWT_ACTIVE_CACHE_TTL:
+            activo, staff = self._get_estado(user.id)
+            if not activo:
+                raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+            # el claim is_staff es el del login y se copia en cada refresh: se usa el de la base
+            user.is_staff = staff
+
+        if settings.JWT_PERMISSION_CLAIMS and VERSION_CLAIM in validated_token:
+            self._check_permisos_version(validated_token, get_permisos_version(user.id))
+
+        return user
+
+    @staticmethod
+    def _check_permisos_version(validated_token, version):
+        # los permisos del token quedaron viejos: el cliente tiene que renovarlo con el refresh token
+        if validated_token[VERSION_CLAIM] != version:
+            raise AuthenticationFailed('Los permisos del usuario cambiaron, renueve el token',
+                                       code='permissions_changed')
+
+    def _get_estado(self, id):
+        id = str(id)
+        estado = usuarios_activos.get(id)
+        if estado is None:
+            estado = self.user_model.objects.filter(
+                **{api_settings.USER_ID_FIELD: id}
+            ).values_list('is_active', 'is_staff').first() or (False, False)
+            usuarios_activos.set(id, estado, expires_at=time.time() + settings.JWT_ACTIVE_CACHE_TTL)
+        return estado
+
+
+class UsuarioModelBackend(ModelBackend):
+    """
+    ModelBackend cuyo aauthenticate (login asíncrono) verifica la contraseña en el pool acotado de threads
+    (authentication.hashing.CheckPasswordPool), así el event loop sigue atendiendo otros requests durante el hash.
+    Con el pool saturado lanza HashPoolSaturado. El authenticate sincrónico es el de ModelBackend.
+    """
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        pool = get_check_password_pool()
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # mismo costo que con un usuario existente, para no revelar cuáles existen
+            await pool.run(make_password, password)
+            return None
+
+        valida, nuevo_hash = await pool.run(verify_password, password, user.password)
+        if not valida or not self.user_can_authenticate(user):
+            return None
+
+        if nuevo_hash:
+            # rehash con la política actual; si la contraseña cambió mientras tanto no se pisa
+            await UserModel._default_manager.filter(pk=user.pk, password=user.password).aupdate(password=nuevo_hash)
+            user.password = nuevo_hash
+        return user
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """
+    TokenBackend de simplejwt que firma y verifica con el key ring (authentication.keyring).
+
+    Los tokens se firman con la clave vigente y llevan su 'kid' en el header; al verificar se elige
+    la clave por ese 'kid'. Los tokens sin 'kid' se verifican con la clave por defecto.
+    Con JWT_VERIFIED_CACHE_ENABLED los claims verificados se guardan hasta el exp del token, así el mismo
+    token no se vuelve a verificar en cada request (autenticación, token/verify/ y token/verify/batch/).
+    """
+
+    def encode(self, payload):
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload["aud"] = self.audience
+        if self.issuer is not None:
+            jwt_payload["iss"] = self.issuer
+
+        try:
+            key = get_keyring().signing_key()
+        except KeyRingError as e:
+            raise TokenBackendError(str(e)) from e
+
+        return jwt.encode(
+            jwt_payload,
+            key.private_key,
+            algorithm=key.algorithm,
+            headers={'kid': key.kid},
+            json_encoder=self.json_encoder,
+        )
+
+    def decode(self, token, verify=True):
+        if not verify or not settings.JWT_VERIFIED_CACHE_ENABLED:
+            return self._decode(token, verify)
+
+        clave = hashlib.sha256(force_bytes(token)).digest()
+        payload = tokens_verificados.get(clave)
+        if payload is None:
+            payload, key = self._decode(token, verify, with_key=True)
+            # la entrada no sobrevive al vencimiento del token ni al retiro de la clave que lo firmó
+            expires_at = min(
+                payload.get('exp', time.time()),
+                key.not_after.timestamp() if key.not_after else float('inf'),
+            )
+            tokens_verificados.set(clave, payload, expires_at=expires_at)
+
+        # copia: los Token de simplejwt modifican su payload (por ej. al rotar el refresh)
+        return dict(payload)
+
+    def _decode(self, token, verify=True, with_key=False):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as e:
+            raise TokenBackendError(_("Token is invalid")) from e
+
+        key = get_keyring().verifying_key(kid)
+        if key is None:
+            raise TokenBackendError(_("Token is invalid"))
+
+        try:
+            payload = jwt.decode(
+                token,
+                key.public_key,
+                algorithms=[key.algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.get_leeway(),
+                options={
+                    "verify_aud": self.audience is not None,
+                    "verify_signature": verify,
+                },
+            )
+        except jwt.InvalidAlgorithmError as e:
+            raise TokenBackendError(_("Invalid algorithm specified")) from e
+        except jwt.ExpiredSignatureError as e:
+            raise TokenBackendExpiredToken(_("Token is expired")) from e
+        except jwt.InvalidTokenError as e:
+            raise TokenBackendError(_("Token is invalid")) from e
+
+        return (payload, key) if with_key else payload
+
+
+def _on_setting_changed(setting, **kwargs):
+    # con otras claves, los tokens verificados antes pueden dejar de ser válidos
+    if setting in ('JWT_KEYS', 'JWT_KEYRING_FILE', 'SIMPLE_JWT', 'JWT_VERIFIED_CACHE_ENABLED'):
+        tokens_verificados.clear()
+
+
+setting_changed.connect(_on_setting_changed)
+
+
+def install_token_backend():
+    """
+    Reemplaza el token backend global de simplejwt por KeyRingTokenBackend. Se llama desde AppConfig.ready(),
+    antes de que cualquier Token lo resuelva.
+    """
+    from rest_framework_simplejwt import state
+
+    state.token_backend = KeyRingTokenBackend(
+        api_settings.ALGORITHM,
+        None,
+        '',
+        api_settings.AUDIENCE,
+        api_settings.ISSUER,
+        None,
+        api_settings.LEEWAY,
+        api_settings.JSON_ENCODER,
+    )
@@ -0,0 +1,212 @@
+import hashlib
+import math
+import threading
+import time
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom: responde 'seguro que no está' o 'puede estar', con una tasa de falsos positivos acotada.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _posiciones(self, value: str):
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value: str):
+        nuevo = False
+        for posicion in self._posiciones(value):
+            bit = 1 << (posicion & 7)
+            if not self._bits[posicion >> 3] & bit:
+                self._bits[posicion >> 3] |= bit
+                nuevo = True
+        # un valor que ya estaba (por ej. releído en la sincronización) no se cuenta otra vez
+        if nuevo:
+            self.count += 1
+
+    def __contains__(self, value: str):
+        return all(self._bits[posicion >> 3] & (1 << (posicion & 7)) for posicion in self._posiciones(value))
+
+
+class BlacklistFilter:
+    """
+    Filtro de Bloom en memoria del proceso con los jti de BlacklistedToken.
+
+    Se sincroniza de forma incremental cada JWT_BLACKLIST_FILTER_SYNC_INTERVAL segundos. Como los ids pueden
+    confirmarse fuera de orden (secuencias de PostgreSQL), cada sincronización relee también los últimos
+    JWT_BLACKLIST_FILTER_SYNC_MARGIN ids ya vistos. Se reconstruye cuando supera su capacidad o cada
+    JWT_BLACKLIST_FILTER_REBUILD_INTERVAL segundos (para descartar los tokens ya podados); la reconstrucción
+    corre sin el lock, y mientras tanto se sigue usando el filtro anterior.
+    Los tokens que se agregan a la blacklist desde este proceso se suman al filtro en el momento.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # un solo thread reconstruye a la vez
+        self._rebuild_lock = threading.Lock()
+        self._filter = None
+        self._last_id = 0
+        self._synced_at = 0.0
+        self._built_at = 0.0
+        # jti agregados desde este proceso durante una reconstrucción, para sumarlos al filtro nuevo
+        self._agregados = None
+
+    def _build(self):
+        ahora = timezone.now()
+        vigentes = BlacklistedToken.objects.filter(token__expires_at__gt=ahora)
+        capacity = max(settings.JWT_BLACKLIST_FILTER_CAPACITY, 2 * vigentes.count())
+
+        bloom = BloomFilter(capacity, settings.JWT_BLACKLIST_FILTER_ERROR_RATE)
+        last_id = 0
+        for id, jti in vigentes.order_by('id').values_list('id', 'token__jti').iterator(chunk_size=5000):
+            bloom.add(jti)
+            last_id = id
+
+        # el último id se toma de toda la tabla para no releer los tokens vencidos en la sincronización
+        last_id = max(last_id, BlacklistedToken.objects.order_by('-id').values_list('id', flat=True).first() or 0)
+        return bloom, last_id
+
+    def _rebuild(self):
+        with self._lock:
+            self._agregados = []
+        try:
+            bloom, last_id = self._build()
+        finally:
+            with self._lock:
+                agregados, self._agregados = self._agregados, None
+
+        with self._lock:
+            for jti in agregados:
+                bloom.add(jti)
+            self._filter, self._last_id = bloom, last_id
+            self._built_at = self._synced_at = time.monotonic()
+
+    def _sync(self):
+        desde = max(0, self._last_id - settings.JWT_BLACKLIST_FILTER_SYNC_MARGIN)
+        nuevos = BlacklistedToken.objects.filter(id__gt=desde).order_by('id').values_list('id', 'token__jti')
+        for id, jti in nuevos:
+            self._filter.add(jti)
+            self._last_id = max(self._last_id, id)
+        self._synced_at = time.monotonic()
+
+    def _needs_rebuild(self):
+        return (
+            self._filter is None
+            or time.monotonic() - self._built_at > settings.JWT_BLACKLIST_FILTER_REBUILD_INTERVAL
+            or self._filter.count > self._filter.capacity
+        )
+
+    def _refresh(self):
+        with self._lock:
+            if not self._needs_rebuild():
+                if time.monotonic() - self._synced_at >= settings.JWT_BLACKLIST_FILTER_SYNC_INTERVAL:
+                    self._sync()
+                if not self._needs_rebuild():
+                    return
+            esperar = self._filter is None
+
+        # si otro thread ya está reconstruyendo se sigue con el filtro actual; sin filtro, se espera al nuevo
+        if not self._rebuild_lock.acquire(blocking=esperar):
+            return
+        try:
+            with self._lock:
+                pendiente = self._needs_rebuild()
+            if pendiente:
+                self._rebuild()
+        finally:
+            self._rebuild_lock.release()
+
+    def might_contain(self, jti: str):
+        self._refresh()
+        with self._lock:
+            return jti in self._filter
+
+    def add(self, jti: str):
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+            if self._agregados is not None:
+                self._agregados.append(jti)
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+            self._last_id = 0
+
+
+blacklist_filter = BlacklistFilter()
+
+
+def is_blacklisted(jti: str):
+    """
+    Indica si el token está en la blacklist. Con el filtro activo, solo se consulta la base de datos
+    cuando el filtro no puede descartarlo.
+    """
+    if settings.JWT_BLACKLIST_FILTER_ENABLED and not blacklist_filter.might_contain(jti):
+        return False
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def blacklisted_jtis(jtis: list):
+    """
+    Cuáles de los jti están en la blacklist, con una sola consulta para todos (la de los que el filtro no descarta).
+
+    :return: set de jti en la blacklist
+    """
+    if settings.JWT_BLACKLIST_FILTER_ENABLED:
+        jtis = [jti for jti in jtis if blacklist_filter.might_contain(jti)]
+    if not jtis:
+        return set()
+    return set(BlacklistedToken.objects.filter(token__jti__in=jtis).values_list('token__jti', flat=True))
+
+
+def on_token_blacklisted(sender, instance, created, **kwargs):
+    # receptor de post_save de BlacklistedToken
+    if created:
+        blacklist_filter.add(instance.token.jti)
+
+
+def prune_expired_tokens(chunk_size: int = None, pause: float = None, max_chunks: int = None, stdout=None):
+    """
+    Elimina los OutstandingToken vencidos (y en cascada sus BlacklistedToken) por bloques, cada uno en su
+    propia transacción y con una pausa entre bloques, para no bloquear las tablas por mucho tiempo.
+
+    :return: cantidad de OutstandingToken eliminados
+    """
+    chunk_size = chunk_size or settings.JWT_TOKEN_PRUNE_CHUNK_SIZE
+    pause = settings.JWT_TOKEN_PRUNE_PAUSE if pause is None else pause
+    ahora = timezone.now()
+
+    eliminados, chunks = 0, 0
+    while max_chunks is None or chunks < max_chunks:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lt=ahora).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(id__in=ids).delete()
+
+        eliminados += len(ids)
+        chunks += 1
+        if stdout is not None:
+            stdout.write(f'{eliminados} tokens eliminados')
+        if pause:
+            time.sleep(pause)
+
+    return eliminados
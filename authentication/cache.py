@@ -0,0 +1,77 @@
+import threading
+from django.conf import settings
+from django.core.cache import caches
+
+
+class UsuarioCache:
+    """
+    Cache read-through de la representación de un usuario (la misma que genera UsuarioSerializer).
+
+    Las entradas expiran según el TIMEOUT del alias USUARIO_CACHE_ALIAS y se descartan por LRU al
+    superar MAX_ENTRIES. Los servicios que modifican un usuario o su perfil deben llamar a invalidate().
+    """
+
+    _lock = threading.Lock()
+    _hits = 0
+    _misses = 0
+
+    def __init__(self):
+        self._cache = caches[settings.USUARIO_CACHE_ALIAS]
+
+    @property
+    def enabled(self):
+        return settings.USUARIO_CACHE_ENABLED
+
+    @staticmethod
+    def _key(id: int):
+        return f'usuario:{id}'
+
+    @classmethod
+    def _count(cls, hit: bool):
+        with cls._lock:
+            if hit:
+                cls._hits += 1
+            else:
+                cls._misses += 1
+
+    def get(self, id: int, version=None):
+        """
+        :param version: versión actual del usuario (updated_at de usuario y perfil). Si se indica, una entrada
+            guardada con otra versión es un miss: la escritura la pudo atender otro proceso, que no invalida
+            este cache
+        """
+        if not self.enabled:
+            return None
+
+        data = None
+        entrada = self._cache.get(self._key(id))
+        if entrada is not None:
+            entrada_version, data = entrada
+            if version is not None and entrada_version != version:
+                data = None
+        self._count(hit=data is not None)
+        return data
+
+    def set(self, id: int, data: dict, version=None):
+        if self.enabled:
+            self._cache.set(self._key(id), (version, data))
+
+    def invalidate(self, id: int):
+        # se invalida aunque el cache esté desactivado, para no dejar entradas viejas al reactivarlo
+        self._cache.delete(self._key(id))
+
+    def clear(self):
+        self._cache.clear()
+        with self._lock:
+            UsuarioCache._hits = 0
+            UsuarioCache._misses = 0
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            total = cls._hits + cls._misses
+            return {
+                'hits': cls._hits,
+                'misses': cls._misses,
+                'hit_rate': cls._hits / total if total else 0.0,
+            }
@@ -0,0 +1,180 @@
+import base64
+import threading
+import time
+from functools import lru_cache
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission
+from django.db.models import F, Q
+from .lru import LRUCache
+from .models import Usuario
+
+PERMISOS_CLAIM = 'perms'
+VERSION_CLAIM = 'pv'
+
+# versión de permisos por id de usuario, en memoria del proceso (modo sin estado)
+versiones_permisos = LRUCache(max_entries=settings.JWT_ACTIVE_CACHE_MAX_ENTRIES)
+
+
+def encode_permisos(ids) -> str:
+    """
+    Codifica un conjunto de ids de Permission como bitset (bit n = Permission con pk n) en base64url.
+    """
+    bitset = 0
+    for id in ids:
+        bitset |= 1 << id
+    data = bitset.to_bytes((bitset.bit_length() + 7) // 8, 'little')
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def decode_permisos(value: str) -> set:
+    data = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+    bitset = int.from_bytes(data, 'little')
+    ids, n = set(), 0
+    while bitset:
+        if bitset & 1:
+            ids.add(n)
+        bitset >>= 1
+        n += 1
+    return ids
+
+
+class PermisosIndex:
+    """
+    Nombres 'app_label.codename' por pk de Permission. Se carga una vez por proceso y se recarga
+    solo cuando aparece un pk desconocido (permiso creado después de la carga).
+    """
+
+    def __init__(self):
+        self._nombres = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        self._nombres = {
+            pk: f'{app_label}.{codename}'
+            for pk, app_label, codename in Permission.objects.values_list('pk', 'content_type__app_label', 'codename')
+        }
+
+    def nombres(self, ids: set) -> frozenset:
+        with self._lock:
+            if self._nombres is None or not ids <= self._nombres.keys():
+                self._load()
+            return frozenset(self._nombres[id] for id in ids if id in self._nombres)
+
+    def clear(self):
+        with self._lock:
+            self._nombres = None
+
+
+permisos_index = PermisosIndex()
+
+
+@lru_cache(maxsize=1024)
+def permisos_from_claim(value: str) -> frozenset:
+    """
+    Permisos ('app_label.codename') del claim; los tokens con los mismos permisos comparten el resultado.
+    """
+    return permisos_index.nombres(decode_permisos(value))
+
+
+def add_permission_claims(token, user):
+    """
+    Agrega al token los permisos del usuario (propios y de sus grupos) y su versión de permisos.
+    """
+    ids = Permission.objects.filter(Q(user=user) | Q(group__user=user)).values_list('pk', flat=True).distinct()
+    token[PERMISOS_CLAIM] = encode_permisos(ids)
+    token[VERSION_CLAIM] = user.permisos_version
+    # al renovar, el access token copia los claims del refresh: is_staff también tiene que ser el actual
+    token['is_staff'] = user.is_staff
+    token['is_superuser'] = user.is_superuser
+
+
+def get_permisos_version(id):
+    id = str(id)
+    version = versiones_permisos.get(id)
+    if version is None:
+        version = Usuario.objects.filter(pk=id).values_list('permisos_version', flat=True).first()
+        versiones_permisos.set(id, version, expires_at=time.time() + settings.JWT_PERMISSIONS_VERSION_TTL)
+    return version
+
+
+def bump_permisos_version(ids):
+    ids = list(ids)
+    if not ids:
+        return
+    Usuario.objects.filter(pk__in=ids).update(permisos_version=F('permisos_version') + 1)
+    for id in ids:
+        versiones_permisos.delete(str(id))
+
+
+def on_permisos_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Receptor de m2m_changed: incrementa la versión de permisos de los usuarios afectados, así sus tokens
+    dejan de aceptarse y el cliente tiene que renovarlos.
+    """
+    if not settings.JWT_PERMISSION_CLAIMS or action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if sender in (Usuario.user_permissions.through, Usuario.groups.through):
+        if not reverse:
+            ids = [instance.pk]
+        elif action == 'pre_clear':
+            ids = instance.user_set.values_list('pk', flat=True)
+        else:
+            ids = pk_set
+    elif sender is Group.permissions.through:
+        if not reverse:
+            grupos = [instance.pk]
+        elif action == 'pre_clear':
+            grupos = instance.group_set.values_list('pk', flat=True)
+        else:
+            grupos = pk_set
+        ids = Usuario.objects.filter(groups__in=grupos).values_list('pk', flat=True).distinct()
+    else:
+        return
+
+    bump_permisos_version(ids)
+
+
+def on_permisos_deleted(sender, instance, **kwargs):
+    """
+    Receptor de pre_delete de Group y Permission: el borrado en cascada de sus relaciones no envía
+    m2m_changed. Los usuarios afectados se buscan antes de borrar, cuando las relaciones todavía existen.
+    """
+    if not settings.JWT_PERMISSION_CLAIMS:
+        return
+    if sender is Group:
+        ids = instance.user_set.values_list('pk', flat=True)
+    else:
+        ids = Usuario.objects.filter(
+            Q(user_permissions=instance) | Q(groups__permissions=instance)
+        ).values_list('pk', flat=True).distinct()
+        permisos_index.clear()
+    bump_permisos_version(ids)
+
+
+# campos del usuario que dan permisos por sí mismos (y van en los claims del token)
+PRIVILEGIOS = ('is_staff', 'is_superuser')
+
+
+def on_usuario_pre_save(sender, instance, raw, update_fields, **kwargs):
+    # receptor de pre_save de Usuario: guarda los privilegios anteriores para compararlos en post_save
+    if not settings.JWT_PERMISSION_CLAIMS or raw or instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & {*PRIVILEGIOS, 'permisos_version'}:
+        return
+
+    actual = Usuario.objects.filter(pk=instance.pk).values_list(*PRIVILEGIOS, 'permisos_version').first()
+    if actual is None:
+        return
+    *privilegios, version = actual
+    instance._privilegios_previos = tuple(privilegios)
+    # una instancia cargada antes de un cambio de permisos no vuelve atrás la versión al guardarse
+    instance.permisos_version = max(instance.permisos_version, version)
+
+
+def on_usuario_post_save(sender, instance, created, **kwargs):
+    # receptor de post_save de Usuario: un cambio de is_staff o is_superuser invalida los tokens emitidos
+    previos = instance.__dict__.pop('_privilegios_previos', None)
+    if previos is not None and previos != tuple(getattr(instance, campo) for campo in PRIVILEGIOS):
+        bump_permisos_version([instance.pk])
+        instance.permisos_version += 1
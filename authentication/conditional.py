@@ -0,0 +1,41 @@
+import hashlib
+from calendar import timegm
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def build_etag(*parts):
+    """
+    ETag fuerte a partir de los valores que determinan la representación (ids, updated_at, campos pedidos).
+    """
+    raw = '|'.join('' if part is None else str(part) for part in parts)
+    return quote_etag(hashlib.sha1(raw.encode('utf-8')).hexdigest())
+
+
+def latest(*timestamps):
+    timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+    return max(timestamps) if timestamps else None
+
+
+def conditional_response(request, etag, last_modified, get_response):
+    """
+    Responde 304 si If-None-Match / If-Modified-Since coinciden con la versión actual,
+    sin llamar a get_response. En otro caso retorna get_response() con los headers ETag y Last-Modified.
+
+    :param etag: ETag de la versión actual
+    :param last_modified: datetime de la última modificación, o None
+    :param get_response: función que arma la respuesta completa
+    """
+    timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = get_response()
+
+    if response.status_code not in (200, 304):
+        return response
+
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    return response
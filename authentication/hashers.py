@@ -0,0 +1,68 @@
+import base64
+import hashlib
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2 con las iteraciones de PASSWORD_PBKDF2_ITERATIONS. Conserva el algoritmo 'pbkdf2_sha256',
+    así los hashes existentes se verifican y, si tienen otra cantidad de iteraciones, se actualizan al hacer login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+def maxmem(n: int, r: int):
+    # la memoria que usa scrypt es 128 * n * r, con margen para que openssl no la rechace
+    return 2 * 128 * n * r
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    """
+    scrypt con los parámetros PASSWORD_SCRYPT_N (potencia de 2), PASSWORD_SCRYPT_R y PASSWORD_SCRYPT_P.
+    """
+
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_N
+
+    @property
+    def block_size(self):
+        return settings.PASSWORD_SCRYPT_R
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_SCRYPT_P
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        # mismo formato que el hasher de Django, pero maxmem sale de los n y r con los que se calcula este hash
+        # (al verificar, los del hash guardado), no de los settings actuales
+        self._check_encode_args(password, salt)
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        hash_ = hashlib.scrypt(password.encode(), salt=salt.encode(), n=n, r=r, p=p, maxmem=maxmem(n, r), dklen=64)
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, n, salt, r, p, hash_)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+    argon2id con PASSWORD_ARGON2_TIME_COST, PASSWORD_ARGON2_MEMORY_COST (KiB) y PASSWORD_ARGON2_PARALLELISM.
+    Requiere argon2-cffi.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.contrib.auth.hashers import check_password, make_password
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    # con el método 'spawn' el proceso hijo no hereda la configuración de django
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangoProject.settings')
+    django.setup()
+
+
+def _get_pool():
+    """
+    :return: (pool de procesos, cantidad de workers con la que se creó)
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            _pool_workers = settings.USUARIO_BULK_HASH_WORKERS or os.cpu_count() or 1
+            _pool = ProcessPoolExecutor(max_workers=_pool_workers, initializer=_init_worker)
+        return _pool, _pool_workers
+
+
+def hash_passwords(passwords: list):
+    """
+    Hashea una lista de contraseñas repartiendo el trabajo entre un pool de procesos.
+    Los lotes chicos se hashean en el proceso actual, donde el costo del pool no se justifica.
+
+    :param passwords: lista de contraseñas en texto plano
+    :return: lista de hashes, en el mismo orden
+    """
+    if len(passwords) < settings.USUARIO_BULK_HASH_MIN_PARALLEL:
+        return [make_password(password) for password in passwords]
+
+    pool, workers = _get_pool()
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def verify_password(password: str, encoded: str):
+    """
+    Verifica la contraseña y, si el hash no sigue la política actual de PASSWORD_HASHERS (otro hasher
+    u otros parámetros), genera el hash nuevo.
+
+    :return: (válida, hash nuevo o None)
+    """
+    nuevo = []
+    valida = check_password(password, encoded, setter=lambda raw: nuevo.append(make_password(raw)))
+    return valida, nuevo[0] if nuevo else None
+
+
+class HashPoolSaturado(Exception):
+    pass
+
+
+class CheckPasswordPool:
+    """
+    Pool acotado de threads para verificar contraseñas sin bloquear el event loop.
+
+    El hash (PBKDF2 de hashlib) libera el GIL, así que los threads verifican en paralelo. Si ya hay
+    max_pending verificaciones en curso o en espera, run() rechaza enseguida con HashPoolSaturado.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _liberar(self, future):
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                raise HashPoolSaturado()
+            self.pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='login-hash')
+
+        future = self._executor.submit(fn, *args)
+        # se libera al terminar el hash, aunque el request se cancele antes
+        future.add_done_callback(self._liberar)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+_check_pool = None
+
+
+def get_check_password_pool() -> CheckPasswordPool:
+    global _check_pool
+    with _pool_lock:
+        if _check_pool is None:
+            _check_pool = CheckPasswordPool(
+                workers=settings.LOGIN_HASH_WORKERS or os.cpu_count() or 1,
+                max_pending=settings.LOGIN_HASH_MAX_PENDING,
+            )
+        return _check_pool
+
+
+def reset_check_password_pool(**kwargs):
+    global _check_pool
+    with _pool_lock:
+        if _check_pool is not None:
+            _check_pool.shutdown()
+        _check_pool = None
+
+
+def _on_setting_changed(setting, **kwargs):
+    if setting in ('LOGIN_HASH_WORKERS', 'LOGIN_HASH_MAX_PENDING'):
+        reset_check_password_pool()
+
+
+setting_changed.connect(_on_setting_changed)
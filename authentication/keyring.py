@@ -0,0 +1,319 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Optional
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, ed25519
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.utils.dateparse import parse_datetime
+from django.utils.http import quote_etag
+from jwt.algorithms import get_default_algorithms
+
+# algoritmos soportados y el tipo de clave que requiere cada uno
+ALGORITHMS = {
+    'RS256': (rsa.RSAPrivateKey, rsa.RSAPublicKey),
+    'ES256': (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey),
+    'EdDSA': (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey),
+}
+
+DEFAULT_KID = 'default'
+
+
+class KeyRingError(Exception):
+    pass
+
+
+def generate_private_key(algorithm: str):
+    """
+    Genera una clave privada nueva para el algoritmo indicado.
+    """
+    if algorithm == 'RS256':
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    if algorithm == 'ES256':
+        return ec.generate_private_key(ec.SECP256R1())
+    if algorithm == 'EdDSA':
+        return ed25519.Ed25519PrivateKey.generate()
+    raise KeyRingError(f'Algoritmo no soportado: {algorithm}')
+
+
+def _parse_fecha(value):
+    if value in (None, '') or isinstance(value, datetime):
+        fecha = value
+    else:
+        fecha = parse_datetime(value)
+        if fecha is None:
+            raise KeyRingError(f'Fecha inválida: {value}')
+    if fecha is not None and fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    return fecha
+
+
+def _read(path):
+    try:
+        with open(path, 'rb') as archivo:
+            return archivo.read()
+    except FileNotFoundError:
+        raise KeyRingError(f'No existe el archivo de clave {path}, se genera con: python manage.py generate_jwt_keys')
+
+
+def _write_temp(path, data: bytes, mode: int):
+    # archivo temporal en el mismo directorio, para poder moverlo de forma atómica
+    directorio = os.path.dirname(os.path.abspath(path))
+    fd, temporal = tempfile.mkstemp(dir=directorio, prefix='.tmp-', suffix='.pem')
+    try:
+        with os.fdopen(fd, 'wb') as archivo:
+            archivo.write(data)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.chmod(temporal, mode)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+    return temporal
+
+
+def write_key_pair(private_key, private_path: str, public_path: str, overwrite: bool = False):
+    """
+    Guarda el par de claves en PEM de forma atómica: ningún proceso lee un archivo a medio escribir.
+
+    Sin overwrite, la clave privada se crea solo si no existe (si otro proceso la creó antes, gana la suya)
+    y la pública se deriva siempre de la privada que quedó en disco, así el par es consistente.
+
+    :return: True si se guardó la clave privada recibida, False si ya existía otra
+    """
+    private_pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    )
+
+    temporal = _write_temp(private_path, private_pem, 0o600)
+    creada = True
+    try:
+        if overwrite:
+            os.replace(temporal, private_path)
+        else:
+            try:
+                os.link(temporal, private_path)
+            except FileExistsError:
+                creada = False
+    finally:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+
+    write_public_key(private_path, public_path)
+    return creada
+
+
+def write_public_key(private_path: str, public_path: str):
+    """
+    Guarda de forma atómica la clave pública derivada de la clave privada que está en disco.
+    """
+    private_key = serialization.load_pem_private_key(_read(private_path), password=None)
+    public_pem = private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    os.replace(_write_temp(public_path, public_pem, 0o644), public_path)
+
+
+@dataclass(frozen=True)
+class JWTKey:
+    kid: str
+    algorithm: str
+    public_key: Any
+    private_key: Any = None
+    # desde cuándo se firma con la clave (rotación programada)
+    not_before: Optional[datetime] = None
+    # desde cuándo deja de aceptarse la clave
+    not_after: Optional[datetime] = None
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Crea la clave a partir de su configuración, leyendo y parseando los PEM una sola vez.
+
+        :param config: kid, algorithm, public_key_file y opcionalmente private_key_file, not_before, not_after
+        """
+        algorithm = config.get('algorithm', 'RS256')
+        if algorithm not in ALGORITHMS:
+            raise KeyRingError(f'Algoritmo no soportado: {algorithm}')
+        tipo_privada, tipo_publica = ALGORITHMS[algorithm]
+
+        private_key = None
+        if config.get('private_key_file'):
+            private_key = serialization.load_pem_private_key(_read(config['private_key_file']), password=None)
+            if not isinstance(private_key, tipo_privada):
+                raise KeyRingError(f"La clave privada de '{config['kid']}' no corresponde a {algorithm}")
+
+        if config.get('public_key_file'):
+            public_key = serialization.load_pem_public_key(_read(config['public_key_file']))
+        elif private_key is not None:
+            public_key = private_key.public_key()
+        else:
+            raise KeyRingError(f"La clave '{config['kid']}' no tiene clave pública")
+
+        if not isinstance(public_key, tipo_publica):
+            raise KeyRingError(f"La clave pública de '{config['kid']}' no corresponde a {algorithm}")
+
+        return cls(
+            kid=config['kid'],
+            algorithm=algorithm,
+            public_key=public_key,
+            private_key=private_key,
+            not_before=_parse_fecha(config.get('not_before')),
+            not_after=_parse_fecha(config.get('not_after')),
+        )
+
+    def to_jwk(self) -> dict:
+        jwk = get_default_algorithms()[self.algorithm].to_jwk(self.public_key, as_dict=True)
+        return {**jwk, 'kid': self.kid, 'alg': self.algorithm, 'use': 'sig'}
+
+    def can_verify(self, now: datetime):
+        return self.not_after is None or now < self.not_after
+
+    def can_sign(self, now: datetime):
+        return (
+            self.private_key is not None
+            and self.can_verify(now)
+            and (self.not_before is None or self.not_before <= now)
+        )
+
+
+class KeyRing:
+    """
+    Conjunto de claves para firmar y verificar JWT, identificadas por 'kid'.
+
+    Se firma con la clave vigente de not_before más reciente, así una clave agregada con not_before
+    a futuro entra en uso sola (rotación programada). Se verifica con cualquier clave no vencida.
+    """
+
+    def __init__(self, keys: list):
+        if not keys:
+            raise KeyRingError('No hay claves configuradas')
+
+        self._keys = {key.kid: key for key in keys}
+        if len(self._keys) != len(keys):
+            raise KeyRingError('Hay claves con el mismo kid')
+
+        # un token sin kid (emitido antes del key ring) se verifica con la clave por defecto o la primera
+        self.default_kid = DEFAULT_KID if DEFAULT_KID in self._keys else keys[0].kid
+
+        # JWKS ya serializado por conjunto de claves vigentes; el actual se arma al cargar el key ring
+        self._jwks = {}
+        self.jwks()
+
+    @classmethod
+    def from_settings(cls):
+        return cls([JWTKey.from_config(config) for config in get_keys_config()])
+
+    def signing_key(self, now: datetime = None) -> JWTKey:
+        now = now or datetime.now(timezone.utc)
+        vigentes = [key for key in self._keys.values() if key.can_sign(now)]
+        if not vigentes:
+            raise KeyRingError('No hay una clave vigente para firmar')
+
+        epoch = datetime.min.replace(tzinfo=timezone.utc)
+        return max(vigentes, key=lambda key: key.not_before or epoch)
+
+    def verifying_key(self, kid: str = None, now: datetime = None) -> Optional[JWTKey]:
+        now = now or datetime.now(timezone.utc)
+        key = self._keys.get(kid or self.default_kid)
+        if key is None or not key.can_verify(now):
+            return None
+        return key
+
+    def verifying_keys(self, now: datetime = None) -> list:
+        now = now or datetime.now(timezone.utc)
+        return [key for key in self._keys.values() if key.can_verify(now)]
+
+    def jwks(self, now: datetime = None):
+        """
+        JWKS (RFC 7517) con las claves públicas que se aceptan para verificar, incluidas las programadas
+        a futuro, así los consumidores las tienen antes de que se empiece a firmar con ellas.
+
+        :return: (cuerpo JSON en bytes, ETag)
+        """
+        keys = self.verifying_keys(now)
+        kids = tuple(key.kid for key in keys)
+        if kids not in self._jwks:
+            body = json.dumps({'keys': [key.to_jwk() for key in keys]}, separators=(',', ':')).encode('utf-8')
+            self._jwks[kids] = (body, quote_etag(hashlib.sha1(body).hexdigest()))
+        return self._jwks[kids]
+
+
+def get_keys_config():
+    """
+    Configuración de las claves: JWT_KEYS en settings, o el JSON de JWT_KEYRING_FILE,
+    o por defecto el par de claves de SIMPLE_JWT (SIGNING_KEY_FILE / VERIFYING_KEY_FILE).
+    """
+    if settings.JWT_KEYS:
+        return settings.JWT_KEYS
+
+    if settings.JWT_KEYRING_FILE:
+        with open(settings.JWT_KEYRING_FILE, encoding='utf-8') as archivo:
+            return json.load(archivo)
+
+    return [{
+        'kid': DEFAULT_KID,
+        'algorithm': settings.SIMPLE_JWT['ALGORITHM'],
+        'private_key_file': settings.SIGNING_KEY_FILE,
+        'public_key_file': settings.VERIFYING_KEY_FILE,
+    }]
+
+
+_keyring = None
+_keyring_lock = threading.Lock()
+
+
+def get_keyring() -> KeyRing:
+    """
+    Key ring del proceso. Las claves se leen y parsean en el primer uso y quedan en memoria.
+    """
+    global _keyring
+    if _keyring is None:
+        with _keyring_lock:
+            if _keyring is None:
+                _keyring = KeyRing.from_settings()
+    return _keyring
+
+
+def preload_keyring():
+    """
+    Carga el key ring al iniciar (AppConfig.ready()), y con él el JWKS ya serializado, si existen los archivos
+    de las claves. Sin las claves (por ej. antes de generate_jwt_keys) o con una clave inválida se sigue
+    cargando en el primer uso, que informa el error.
+    """
+    try:
+        configs = get_keys_config()
+    except (OSError, ValueError):
+        return
+
+    archivos = [config[campo] for config in configs
+                for campo in ('private_key_file', 'public_key_file') if config.get(campo)]
+    if not all(os.path.exists(archivo) for archivo in archivos):
+        return
+
+    try:
+        get_keyring()
+    except (KeyRingError, OSError, ValueError):
+        pass
+
+
+def reset_keyring(**kwargs):
+    global _keyring
+    with _keyring_lock:
+        _keyring = None
+
+
+def _on_setting_changed(setting, **kwargs):
+    if setting in ('JWT_KEYS', 'JWT_KEYRING_FILE', 'SIMPLE_JWT'):
+        reset_keyring()
+
+
+setting_changed.connect(_on_setting_changed)
@@ -0,0 +1,85 @@
+import timeit
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from ...hashers import PBKDF2PasswordHasher, ScryptPasswordHasher, Argon2PasswordHasher
+
+
+class Command(BaseCommand):
+    help = ('Mide el tiempo de hash de contraseñas en esta máquina y sugiere los parámetros del hasher '
+            'para una latencia objetivo de login.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hasher', choices=['pbkdf2', 'scrypt', 'argon2'], default=None,
+                            help='Por defecto el configurado en PASSWORD_HASHER')
+        parser.add_argument('--target-ms', type=float, default=250, help='Latencia objetivo de un hash')
+        parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por medición, se toma la mejor')
+
+    def _medir(self, hasher_class, repeat, **parametros):
+        """
+        :return: milisegundos de un hash con los parámetros indicados
+        """
+        with override_settings(**parametros):
+            hasher = hasher_class()
+            salt = hasher.salt()
+            return min(timeit.repeat(lambda: hasher.encode('benchmark', salt), number=1, repeat=repeat)) * 1000
+
+    def _pbkdf2(self, target, repeat):
+        # el costo es lineal en las iteraciones: se mide una base y se escala
+        base = 100000
+        ms = self._medir(PBKDF2PasswordHasher, repeat, PASSWORD_PBKDF2_ITERATIONS=base)
+        iteraciones = max(10000, int(base * target / ms) // 10000 * 10000)
+        return {'PASSWORD_PBKDF2_ITERATIONS': iteraciones}
+
+    def _scrypt(self, target, repeat):
+        # n tiene que ser potencia de 2: se duplica mientras no se supere el objetivo
+        r, p = settings.PASSWORD_SCRYPT_R, settings.PASSWORD_SCRYPT_P
+        n = 2 ** 10
+        while self._medir(ScryptPasswordHasher, repeat, PASSWORD_SCRYPT_N=n * 2, PASSWORD_SCRYPT_R=r,
+                          PASSWORD_SCRYPT_P=p) <= target:
+            n *= 2
+        return {'PASSWORD_SCRYPT_N': n, 'PASSWORD_SCRYPT_R': r, 'PASSWORD_SCRYPT_P': p}
+
+    def _argon2(self, target, repeat):
+        # con la memoria fija, el costo es lineal en time_cost
+        try:
+            import argon2  # noqa: F401
+        except ImportError:
+            raise CommandError('argon2 requiere argon2-cffi instalado')
+
+        memory, parallelism = settings.PASSWORD_ARGON2_MEMORY_COST, settings.PASSWORD_ARGON2_PARALLELISM
+        ms = self._medir(Argon2PasswordHasher, repeat, PASSWORD_ARGON2_TIME_COST=1,
+                         PASSWORD_ARGON2_MEMORY_COST=memory, PASSWORD_ARGON2_PARALLELISM=parallelism)
+        return {'PASSWORD_ARGON2_TIME_COST': max(1, int(target / ms)), 'PASSWORD_ARGON2_MEMORY_COST': memory,
+                'PASSWORD_ARGON2_PARALLELISM': parallelism}
+
+    def handle(self, *args, **options):
+        nombre = options['hasher'] or settings.PASSWORD_HASHER
+        target, repeat = options['target_ms'], options['repeat']
+        hasher_class = {'pbkdf2': PBKDF2PasswordHasher, 'scrypt': ScryptPasswordHasher,
+                        'argon2': Argon2PasswordHasher}[nombre]
+
+        if nombre == 'pbkdf2':
+            actual = {'PASSWORD_PBKDF2_ITERATIONS': settings.PASSWORD_PBKDF2_ITERATIONS}
+        elif nombre == 'scrypt':
+            actual = {'PASSWORD_SCRYPT_N': settings.PASSWORD_SCRYPT_N, 'PASSWORD_SCRYPT_R': settings.PASSWORD_SCRYPT_R,
+                      'PASSWORD_SCRYPT_P': settings.PASSWORD_SCRYPT_P}
+        else:
+            actual = {'PASSWORD_ARGON2_TIME_COST': settings.PASSWORD_ARGON2_TIME_COST,
+                      'PASSWORD_ARGON2_MEMORY_COST': settings.PASSWORD_ARGON2_MEMORY_COST,
+                      'PASSWORD_ARGON2_PARALLELISM': settings.PASSWORD_ARGON2_PARALLELISM}
+
+        sugerido = getattr(self, f'_{nombre}')(target, repeat)
+
+        ms_actual = self._medir(hasher_class, repeat, **actual)
+        ms_sugerido = self._medir(hasher_class, repeat, **sugerido)
+
+        self.stdout.write(f'hasher: {nombre}, objetivo: {target:.0f} ms')
+        self.stdout.write(f'actual:   {ms_actual:8.1f} ms  {actual}')
+        self.stdout.write(f'sugerido: {ms_sugerido:8.1f} ms  {sugerido}')
+        self.stdout.write('Variables de entorno sugeridas:')
+        self.stdout.write(f'PASSWORD_HASHER={nombre}')
+        for clave, valor in sugerido.items():
+            self.stdout.write(f'{clave}={valor}')
+        self.stdout.write(f'Cada thread de LOGIN_HASH_WORKERS verifica como máximo unos {1000 / ms_sugerido:.1f} '
+                          f'logins por segundo.')
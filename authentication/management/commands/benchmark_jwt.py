@@ -0,0 +1,45 @@
+import time
+import jwt
+from django.core.management.base import BaseCommand, CommandError
+from ...keyring import ALGORITHMS, generate_private_key
+
+
+class Command(BaseCommand):
+    help = 'Mide firmas y verificaciones de JWT por segundo para cada algoritmo del key ring'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--algorithms', nargs='+', default=list(ALGORITHMS), choices=list(ALGORITHMS))
+        parser.add_argument('--seconds', type=float, default=1.0, help='Duración de cada medición')
+
+    @staticmethod
+    def _por_segundo(funcion, segundos):
+        operaciones, inicio = 0, time.perf_counter()
+        while time.perf_counter() - inicio < segundos:
+            funcion()
+            operaciones += 1
+        return operaciones / (time.perf_counter() - inicio)
+
+    def handle(self, *args, **options):
+        payload = {'token_type': 'access', 'exp': int(time.time()) + 3600, 'jti': 'x' * 32, 'user_id': '1',
+                   'username': 'usuario', 'is_staff': False}
+        segundos = options['seconds']
+
+        self.stdout.write(f"{'algoritmo':>10} {'firmas/s':>12} {'verificaciones/s':>18} {'largo token':>12}")
+        for algorithm in options['algorithms']:
+            # claves parseadas una sola vez, como en el key ring
+            private_key = generate_private_key(algorithm)
+            public_key = private_key.public_key()
+            token = jwt.encode(payload, private_key, algorithm=algorithm, headers={'kid': algorithm})
+
+            try:
+                jwt.decode(token, public_key, algorithms=[algorithm])
+            except jwt.InvalidTokenError as e:
+                raise CommandError(f'Error al verificar con {algorithm}: {e}')
+
+            firmas = self._por_segundo(
+                lambda: jwt.encode(payload, private_key, algorithm=algorithm, headers={'kid': algorithm}), segundos
+            )
+            verificaciones = self._por_segundo(
+                lambda: jwt.decode(token, public_key, algorithms=[algorithm]), segundos
+            )
+            self.stdout.write(f'{algorithm:>10} {firmas:>12.0f} {verificaciones:>18.0f} {len(token):>12}')
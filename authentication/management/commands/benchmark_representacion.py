@@ -0,0 +1,71 @@
+import datetime
+import timeit
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from ...models import Usuario, Perfil
+from ...representations import UsuarioRepresentation
+from ...serializers import UsuarioSerializer
+
+
+class Command(BaseCommand):
+    help = ('Compara el costo de UsuarioSerializer contra UsuarioRepresentation (filas de values()) '
+            'para distintas cantidades de filas. No usa la base de datos.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1, 1000, 100000])
+        parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por medición, se toma la mejor')
+        parser.add_argument('--fields', default=None, help='Campos de la representación, ej. id,username')
+
+    @staticmethod
+    def _datos(cantidad: int):
+        instancias, filas = [], []
+        for i in range(cantidad):
+            usuario = Usuario(id=i + 1, username=f'usuario{i}', email=f'usuario{i}@email.com')
+            fila = {'id': usuario.id, 'username': usuario.username, 'email': usuario.email, 'perfil__id': None,
+                    'perfil__nombre': None, 'perfil__apellido': None, 'perfil__fecha_nacimiento': None}
+
+            # la mitad de los usuarios con perfil
+            if i % 2 == 0:
+                perfil = Perfil(id=i + 1, nombre='Nombre', apellido='Apellido',
+                                fecha_nacimiento=datetime.date(2000, 1, 1))
+                usuario.perfil = perfil
+                fila.update({'perfil__id': perfil.id, 'perfil__nombre': perfil.nombre,
+                             'perfil__apellido': perfil.apellido,
+                             'perfil__fecha_nacimiento': perfil.fecha_nacimiento})
+            else:
+                # como si viniera de select_related sin perfil: sin consulta al acceder
+                Usuario.perfil.related.set_cached_value(usuario, None)
+            instancias.append(usuario)
+            filas.append(fila)
+        return instancias, filas
+
+    def handle(self, *args, **options):
+        try:
+            fields = UsuarioSerializer.parse_fields(options['fields'])
+        except Exception as e:
+            raise CommandError(e)
+
+        representation = UsuarioRepresentation.for_fields(fields)
+        renderer = JSONRenderer()
+        repeat = options['repeat']
+
+        self.stdout.write(f"{'filas':>10} {'serializer (ms)':>16} {'fast path (ms)':>16} {'speedup':>8}")
+        for cantidad in options['rows']:
+            instancias, filas = self._datos(cantidad)
+
+            def serializer():
+                return UsuarioSerializer(instancias, many=True, fields=fields).data
+
+            def fast_path():
+                return representation.to_list(filas)
+
+            if renderer.render(serializer()) != renderer.render(fast_path()):
+                raise CommandError(f'Las salidas difieren para {cantidad} filas')
+
+            numero = max(1, 1000 // cantidad)
+            t_serializer = min(timeit.repeat(serializer, number=numero, repeat=repeat)) / numero * 1000
+            t_fast_path = min(timeit.repeat(fast_path, number=numero, repeat=repeat)) / numero * 1000
+
+            self.stdout.write(
+                f'{cantidad:>10} {t_serializer:>16.3f} {t_fast_path:>16.3f} {t_serializer / t_fast_path:>7.1f}x'
+            )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from ...services.UsuarioService import UsuarioService
+
+
+class Command(BaseCommand):
+    help = 'Exporta los usuarios y sus datos de perfil en formato ndjson o csv'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=list(UsuarioService.EXPORT_FORMATOS), default='ndjson')
+        parser.add_argument('--output', help='Archivo de salida, por defecto la salida estándar')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Filas leídas por bloque')
+
+    def handle(self, *args, **options):
+        lineas = UsuarioService().iter_export(options['formato'], chunk_size=options['chunk_size'])
+
+        if not options['output']:
+            for linea in lineas:
+                self.stdout.write(linea, ending='')
+            return
+
+        try:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as archivo:
+                for linea in lineas:
+                    archivo.write(linea)
+        except OSError as e:
+            raise CommandError(f'Error al escribir la exportación: {e}')
+
+        self.stderr.write(f"Exportación guardada en {options['output']}")
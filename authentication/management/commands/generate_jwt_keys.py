@@ -0,0 +1,47 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from ...keyring import ALGORITHMS, generate_private_key, write_key_pair, write_public_key, reset_keyring
+
+
+class Command(BaseCommand):
+    help = ('Genera el par de claves para firmar y verificar JWT (SIGNING_KEY_FILE / VERIFYING_KEY_FILE). '
+            'Los archivos se escriben de forma atómica.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--algorithm', choices=list(ALGORITHMS), default=None,
+                            help='Por defecto el ALGORITHM de SIMPLE_JWT')
+        parser.add_argument('--private', default=None, help='Por defecto SIGNING_KEY_FILE')
+        parser.add_argument('--public', default=None, help='Por defecto VERIFYING_KEY_FILE')
+        grupo = parser.add_mutually_exclusive_group()
+        grupo.add_argument('--if-missing', action='store_true',
+                           help='No reemplaza una clave privada existente, solo genera la pública si falta '
+                                '(para el arranque de contenedores)')
+        grupo.add_argument('--force', action='store_true',
+                           help='Reemplaza las claves existentes; los tokens emitidos dejan de ser válidos')
+
+    def handle(self, *args, **options):
+        algorithm = options['algorithm'] or settings.SIMPLE_JWT['ALGORITHM']
+        private_path = options['private'] or settings.SIGNING_KEY_FILE
+        public_path = options['public'] or settings.VERIFYING_KEY_FILE
+
+        if os.path.exists(private_path) and not options['force']:
+            if options['if_missing'] and os.path.exists(public_path):
+                self.stdout.write(f'La clave {private_path} ya existe')
+                return
+            if options['if_missing']:
+                # la pública se deriva de la privada existente, así no se invalidan los tokens emitidos
+                write_public_key(private_path, public_path)
+                reset_keyring()
+                self.stdout.write(self.style.SUCCESS(f'Clave pública {public_path} generada desde {private_path}'))
+                return
+            raise CommandError(f'La clave {private_path} ya existe, use --force para reemplazarla')
+
+        creada = write_key_pair(generate_private_key(algorithm), private_path, public_path,
+                                overwrite=options['force'])
+        reset_keyring()
+
+        if not creada:
+            self.stdout.write(f'Otro proceso generó {private_path}, se usa esa clave')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Claves {algorithm} generadas: {private_path}, {public_path}'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from ...blacklist import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = ('Elimina los OutstandingToken y BlacklistedToken vencidos por bloques, con una pausa entre bloques '
+            'para no bloquear las tablas de la blacklist.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None, help='Filas por bloque')
+        parser.add_argument('--pause', type=float, default=None, help='Segundos de pausa entre bloques')
+        parser.add_argument('--max-chunks', type=int, default=None, help='Cantidad máxima de bloques por ejecución')
+
+    def handle(self, *args, **options):
+        eliminados = prune_expired_tokens(
+            chunk_size=options['chunk_size'],
+            pause=options['pause'],
+            max_chunks=options['max_chunks'],
+            stdout=self.stdout if options['verbosity'] > 1 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Tokens vencidos eliminados: {eliminados}'))
@@ -0,0 +1,49 @@
+import threading
+from collections import Counter, deque
+
+
+class LatencyMetrics:
+    """
+    Latencias de las últimas 'window' operaciones (para los percentiles) y contadores por resultado.
+    Seguro para usar desde varios threads. Los valores son por proceso.
+    """
+
+    def __init__(self, window: int):
+        self._latencias = deque(maxlen=window)
+        self._resultados = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, resultado: str, latencia: float = None):
+        """
+        :param resultado: nombre del resultado, ej. 'ok', 'fallido', 'rechazado'
+        :param latencia: segundos; sin latencia solo se cuenta el resultado
+        """
+        with self._lock:
+            self._resultados[resultado] += 1
+            if latencia is not None:
+                self._latencias.append(latencia)
+
+    @staticmethod
+    def _percentil(ordenadas: list, percentil: float):
+        if not ordenadas:
+            return None
+        indice = min(len(ordenadas) - 1, int(round(percentil / 100 * (len(ordenadas) - 1))))
+        return ordenadas[indice]
+
+    def clear(self):
+        with self._lock:
+            self._latencias.clear()
+            self._resultados.clear()
+
+    def stats(self):
+        with self._lock:
+            ordenadas = sorted(self._latencias)
+            resultados = dict(self._resultados)
+
+        p50, p99 = self._percentil(ordenadas, 50), self._percentil(ordenadas, 99)
+        return {
+            'count': len(ordenadas),
+            'p50_ms': round(p50 * 1000, 3) if p50 is not None else None,
+            'p99_ms': round(p99 * 1000, 3) if p99 is not None else None,
+            'resultados': resultados,
+        }
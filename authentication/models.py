@@ -39,6 +39,7 @@ class Perfil(models.Model):
     fecha_nacimiento = models.DateField(verbose_name='Fecha de Nacimiento', blank=True, null=True)
     imagen = models.ImageField(verbose_name='Imagen de Perfil', upload_to='perfil/', max_length=200, blank=True,
                                null=True)
+    updated_at = models.DateTimeField(verbose_name='Última Modificación', auto_now=True)
 
 
 class Usuario(AbstractBaseUser, PermissionsMixin):
@@ -49,10 +50,23 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     email_confirmado = models.BooleanField(verbose_name='Email Confirmado', default=False, null=False, editable=False)
     is_active = models.BooleanField(default=True, null=False)
     is_staff = models.BooleanField(default=False, null=False)
+    updated_at = models.DateTimeField(verbose_name='Última Modificación', auto_now=True)
+    # se incrementa al cambiar los permisos o grupos del usuario (authentication.claims)
+    permisos_version = models.PositiveIntegerField(verbose_name='Versión de Permisos', default=0, editable=False)
     objects = UsuarioManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', ]
 
+    class Meta:
+        indexes = [
+            # índice parcial para la paginación por keyset del listado de usuarios
+            models.Index(
+                fields=['id'],
+                condition=models.Q(is_active=True, is_superuser=False),
+                name='usuario_listado_id_idx'
+            ),
+        ]
+
     def __str__(self):
         return f'{self.email} - {self.username}'
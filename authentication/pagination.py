@@ -0,0 +1,98 @@
+import base64
+from django.conf import settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorInvalido(Exception):
+    pass
+
+
+class KeysetPaginator:
+    """
+    Paginación por keyset sobre el campo 'id'.
+
+    El cursor es opaco para el cliente: codifica la dirección ('n' siguiente, 'p' anterior)
+    y el último id visto. Cada página es un rango 'id > x' o 'id < x' resuelto por índice,
+    por lo que la página N cuesta lo mismo que la primera.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def __init__(self, page_size=None):
+        self.page_size = self._get_page_size(page_size)
+
+    @staticmethod
+    def _get_page_size(page_size):
+        default = settings.USUARIO_PAGE_SIZE
+        maximo = settings.USUARIO_MAX_PAGE_SIZE
+
+        if page_size in (None, ''):
+            return default
+
+        page_size = int(page_size)
+        if page_size < 1:
+            return default
+        return min(page_size, maximo)
+
+    @staticmethod
+    def encode_cursor(direccion: str, id: int):
+        raw = f'{direccion}:{id}'.encode('ascii')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor: str):
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(cursor + padding).decode('ascii')
+            direccion, id = raw.split(':', 1)
+            if direccion not in ('n', 'p'):
+                raise ValueError(direccion)
+            return direccion, int(id)
+        except (ValueError, UnicodeDecodeError):
+            raise CursorInvalido(f'Cursor inválido: {cursor}')
+
+    @staticmethod
+    def _get_id(fila):
+        # las filas pueden ser instancias del modelo o diccionarios de values()
+        return fila['id'] if isinstance(fila, dict) else fila.id
+
+    def paginate(self, queryset, cursor=None):
+        """
+        Retorna (filas, cursor_siguiente, cursor_anterior) para el queryset dado.
+        """
+        size = self.page_size
+
+        if not cursor:
+            direccion, id = 'n', None
+        else:
+            direccion, id = self.decode_cursor(cursor)
+
+        if direccion == 'n':
+            if id is not None:
+                queryset = queryset.filter(id__gt=id)
+            filas = list(queryset.order_by('id')[:size + 1])
+            hay_mas = len(filas) > size
+            filas = filas[:size]
+
+            next_cursor = self.encode_cursor('n', self._get_id(filas[-1])) if hay_mas and filas else None
+            prev_cursor = self.encode_cursor('p', self._get_id(filas[0])) if id is not None and filas else None
+        else:
+            filas = list(queryset.filter(id__lt=id).order_by('-id')[:size + 1])
+            hay_mas = len(filas) > size
+            filas = filas[:size][::-1]
+
+            next_cursor = self.encode_cursor('n', self._get_id(filas[-1])) if filas else None
+            prev_cursor = self.encode_cursor('p', self._get_id(filas[0])) if hay_mas and filas else None
+
+        return filas, next_cursor, prev_cursor
+
+    def get_links(self, base_url, next_cursor, prev_cursor):
+        base_url = base_url or ''
+
+        def build(cursor):
+            if cursor is None:
+                return None
+            return replace_query_param(base_url, self.cursor_query_param, cursor)
+
+        return {'next': build(next_cursor), 'prev': build(prev_cursor)}
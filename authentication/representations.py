@@ -0,0 +1,59 @@
+from functools import lru_cache
+from .serializers import UsuarioSerializer
+
+# columna de values() para cada clave de la representación de un usuario
+_COLUMNAS_USUARIO = (
+    ('id', 'id'),
+    ('username', 'username'),
+    ('email', 'email'),
+)
+_COLUMNAS_PERFIL = (
+    ('nombre', 'perfil__nombre'),
+    ('apellido', 'perfil__apellido'),
+    ('fecha_nacimiento', 'perfil__fecha_nacimiento'),
+)
+
+
+class UsuarioRepresentation:
+    """
+    Representación precompilada de un usuario a partir de filas de values(), sin instanciar modelos
+    ni serializers. Produce la misma salida que UsuarioSerializer.to_representation para los mismos campos.
+
+    Usar UsuarioRepresentation.for_fields(fields), que reutiliza una instancia por combinación de campos.
+    """
+
+    def __init__(self, fields: frozenset = None):
+        fields = fields or frozenset(UsuarioSerializer.REPRESENTATION_FIELDS)
+
+        self._usuario = tuple((clave, columna) for clave, columna in _COLUMNAS_USUARIO if clave in fields)
+        self._perfil = _COLUMNAS_PERFIL if 'perfil' in fields else ()
+
+        # 'id' siempre se consulta: la paginación lo necesita. 'perfil__id' indica si el usuario tiene perfil
+        columnas = ['id'] + [columna for clave, columna in self._usuario if columna != 'id']
+        if self._perfil:
+            columnas += ['perfil__id'] + [columna for clave, columna in self._perfil]
+        self.columns = tuple(columnas)
+
+    @classmethod
+    def for_fields(cls, fields=None):
+        return _compilar(frozenset(fields) if fields else None)
+
+    def values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def to_representation(self, row: dict):
+        representation = {clave: row[columna] for clave, columna in self._usuario}
+
+        if self._perfil and row['perfil__id'] is not None:
+            representation['perfil'] = {clave: row[columna] for clave, columna in self._perfil}
+
+        return representation
+
+    def to_list(self, rows):
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def _compilar(fields):
+    return UsuarioRepresentation(fields)
@@ -4,8 +4,11 @@ from rest_framework import status
 
 class SuccessResponse:
     @staticmethod
-    def ok(data=None, message=None):
-        return Response({'status': 'success', 'data': data, 'message': message}, status=status.HTTP_200_OK)
+    def ok(data=None, message=None, links=None):
+        body = {'status': 'success', 'data': data, 'message': message}
+        if links is not None:
+            body['links'] = links
+        return Response(body, status=status.HTTP_200_OK)
 
     @staticmethod
     def created(data=None, message=None):
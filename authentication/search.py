@@ -0,0 +1,74 @@
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Índices para la búsqueda por prefijo de username y email. Como dependen del motor de base de datos
+# no se declaran en Meta.indexes: se crean al terminar 'migrate' (señal post_migrate).
+POSTGRESQL_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS usuario_username_prefix_idx '
+    'ON authentication_usuario (UPPER(username::text) text_pattern_ops)',
+    'CREATE INDEX IF NOT EXISTS usuario_email_prefix_idx '
+    'ON authentication_usuario (UPPER(email::text) text_pattern_ops)',
+]
+
+# En SQLite se usa una tabla FTS5 de contenido externo, sincronizada con triggers.
+# tokenchars hace que cada username/email sea un único token, así 'term*' es un prefijo del valor completo.
+SQLITE_FTS_TABLE = 'usuario_fts'
+SQLITE_FTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5(
+        username, email,
+        content='authentication_usuario', content_rowid='id',
+        tokenize="unicode61 tokenchars '._@-+'", prefix='2 3 4'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ai AFTER INSERT ON authentication_usuario BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, username, email) VALUES (new.id, new.username, new.email);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ad AFTER DELETE ON authentication_usuario BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, username, email)
+        VALUES ('delete', old.id, old.username, old.email);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_au AFTER UPDATE OF username, email ON authentication_usuario
+    BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, username, email)
+        VALUES ('delete', old.id, old.username, old.email);
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, username, email) VALUES (new.id, new.username, new.email);
+    END""",
+]
+
+
+def create_search_indexes(sender, using='default', **kwargs):
+    """
+    Receptor de post_migrate: crea los índices de búsqueda del motor de base de datos en uso.
+    """
+    connection = connections[using]
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for sql in POSTGRESQL_INDEXES:
+                cursor.execute(sql)
+
+        elif connection.vendor == 'sqlite':
+            existe = SQLITE_FTS_TABLE in connection.introspection.table_names(cursor)
+            for sql in SQLITE_FTS:
+                cursor.execute(sql)
+            if not existe:
+                # indexa los usuarios que ya estaban cargados
+                cursor.execute(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')")
+
+
+def _fts_prefix_query(q: str):
+    termino = q.replace('"', '""')
+    return f'{{username email}} : "{termino}"*'
+
+
+def filter_by_prefix(queryset, q: str):
+    """
+    Filtra el queryset por prefijo de username o email, sin distinguir mayúsculas,
+    usando el índice que corresponda al motor de base de datos.
+    """
+    if connections[queryset.db].vendor == 'sqlite':
+        ids = RawSQL(f'SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s', [_fts_prefix_query(q)])
+        return queryset.filter(id__in=ids)
+
+    # en PostgreSQL se traduce a UPPER(col::text) LIKE UPPER('q%'), resuelto con los índices text_pattern_ops
+    return queryset.filter(Q(username__istartswith=q) | Q(email__istartswith=q))
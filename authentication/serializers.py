@@ -1,25 +1,63 @@
 import re
 from datetime import timezone, datetime
+from django.conf import settings
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, AuthUser
-from rest_framework_simplejwt.tokens import Token
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer, \
+    TokenVerifySerializer, AuthUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token, UntypedToken
 
 from .models import Usuario, Perfil
+from .blacklist import is_blacklisted
+from .tokens import UsuarioRefreshToken
+from .claims import add_permission_claims
 
 
 class UsuarioSerializer(serializers.ModelSerializer):
+    # claves que puede tener la representación de un usuario, en orden
+    REPRESENTATION_FIELDS = ('id', 'username', 'email', 'perfil')
+
     class Meta:
         model = Usuario
         fields = ('username', 'password', 'email')
 
+    def __init__(self, *args, fields=None, **kwargs):
+        # fields: subconjunto de REPRESENTATION_FIELDS a serializar, None para todos
+        self._representation_fields = fields
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def parse_fields(cls, value):
+        """
+        Convierte el parámetro 'fields' (ej. 'id,username') en un conjunto de campos válidos.
+
+        :return: set de campos o None si no se pidió ninguno
+        """
+        if not value:
+            return None
+
+        fields = {field.strip() for field in value.split(',') if field.strip()}
+        if not fields:
+            # ej. '?fields=,': igual que no pedir ninguno
+            return None
+        invalidos = fields - set(cls.REPRESENTATION_FIELDS)
+        if invalidos:
+            raise serializers.ValidationError(
+                {'fields': f"Campos inválidos: {', '.join(sorted(invalidos))}"}
+            )
+        return fields
+
     def to_representation(self, instance):
-        representation = {
-            'id': instance.id,
-            'username': instance.username,
-            'email': instance.email,
-        }
+        fields = self._representation_fields or self.REPRESENTATION_FIELDS
+
+        representation = {}
+        for field in ('id', 'username', 'email'):
+            if field in fields:
+                representation[field] = getattr(instance, field)
 
-        if hasattr(instance, 'perfil'):
+        # sin 'perfil' entre los campos pedidos no se accede a la relación
+        if 'perfil' in fields and hasattr(instance, 'perfil'):
             representation['perfil'] = {
                 'nombre': instance.perfil.nombre,
                 'apellido': instance.perfil.apellido,
@@ -72,6 +110,24 @@ class UsuarioSerializer(serializers.ModelSerializer):
         return user
 
 
+class BulkUsuarioSerializer(UsuarioSerializer):
+    """
+    Valida cada usuario del alta masiva. La unicidad de username y email se verifica
+    para todo el lote en UsuarioService, con una consulta por campo.
+    """
+
+    class Meta(UsuarioSerializer.Meta):
+        extra_kwargs = {
+            'username': {'validators': []},
+            'email': {'validators': []},
+        }
+
+
+class BatchUsuarioSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), required=True)
+    fields = serializers.CharField(required=False)
+
+
 class UpdateUsernameSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -166,10 +222,34 @@ class ConfirmarEmailSerializer(serializers.ModelSerializer):
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = UsuarioRefreshToken
+
     @classmethod
     def get_token(cls, user: AuthUser) -> Token:
         token = super().get_token(user)
 
         token['username'] = user.username
+        # lo usa TokenUser en la autenticación sin estado
+        token['is_staff'] = user.is_staff
+        if settings.JWT_PERMISSION_CLAIMS:
+            add_permission_claims(token, user)
 
         return token
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = UsuarioRefreshToken
+
+
+class BatchTokenVerifySerializer(serializers.Serializer):
+    tokens = serializers.ListField(child=serializers.CharField(), required=True)
+
+
+class CustomTokenVerifySerializer(TokenVerifySerializer):
+    def validate(self, attrs):
+        token = UntypedToken(attrs['token'])
+
+        if api_settings.BLACKLIST_AFTER_ROTATION and is_blacklisted(token.get(api_settings.JTI_CLAIM)):
+            raise serializers.ValidationError(_("Token is blacklisted"))
+
+        return {}
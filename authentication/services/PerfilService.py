@@ -1,6 +1,7 @@
 from ..serializers import PerfilSerializer
 from ..responses import ErrorResponse, SuccessResponse
 from .UsuarioService import UsuarioService
+from ..cache import UsuarioCache
 
 
 class PerfilService:
@@ -8,6 +9,7 @@ class PerfilService:
         self._model = PerfilSerializer.Meta.model
         self._serializer_class = PerfilSerializer
         self._queryset = None
+        self._cache = UsuarioCache()
 
     def _get_object(self, pk):
         try:
@@ -51,6 +53,7 @@ class PerfilService:
                     return ErrorResponse.bad_request(message=message)
 
                 serializer.save(usuario=usuario)
+                self._cache.invalidate(id)
                 message = 'Perfil Agregado a usuario'
                 return SuccessResponse.ok(message=message, data=serializer.validated_data)
             return ErrorResponse.bad_request(message='Datos inválidos', errors=serializer.errors)
@@ -87,6 +90,7 @@ class PerfilService:
                 usuario.perfil.apellido = serializer.validated_data['apellido']
                 usuario.perfil.fecha_nacimiento = serializer.validated_data['fecha_nacimiento']
                 usuario.perfil.save()
+                self._cache.invalidate(user_id)
 
                 message = 'Perfil actualizado'
                 return SuccessResponse.ok(message=message, data=serializer.validated_data)
@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+from django.conf import settings
+from rest_framework_simplejwt import state
+from rest_framework_simplejwt.exceptions import TokenBackendError, TokenBackendExpiredToken
+from rest_framework_simplejwt.settings import api_settings
+from ..blacklist import blacklisted_jtis
+from ..responses import SuccessResponse, ErrorResponse
+
+
+class TokenService:
+
+    @staticmethod
+    def _exp(payload: dict):
+        exp = payload.get('exp')
+        return datetime.fromtimestamp(exp, tz=timezone.utc).isoformat() if exp is not None else None
+
+    def verify_tokens(self, tokens: list):
+        """
+        Verifica una lista de tokens. Las firmas se verifican en un solo recorrido con las claves ya parseadas
+        del key ring, y la blacklist se consulta una sola vez para todo el lote.
+
+        :param tokens: lista de tokens
+        :return: un resultado por token, en el mismo orden: valid, error, token_type, exp y blacklisted
+        """
+        try:
+            if not isinstance(tokens, list) or not tokens or not all(isinstance(token, str) for token in tokens):
+                return ErrorResponse.bad_request(message='Se esperaba una lista de tokens')
+
+            max_tokens = settings.JWT_VERIFY_BATCH_MAX_TOKENS
+            if len(tokens) > max_tokens:
+                return ErrorResponse.bad_request(message=f'No se pueden verificar más de {max_tokens} tokens')
+
+            backend = state.token_backend
+            resultados, jtis = [], []
+            for token in tokens:
+                resultado = {'valid': False, 'error': None, 'token_type': None, 'exp': None, 'blacklisted': False}
+                try:
+                    payload = backend.decode(token)
+                    resultado['valid'] = True
+                except TokenBackendExpiredToken:
+                    # la firma es válida, el payload se lee solo para informar el vencimiento
+                    payload = backend.decode(token, verify=False)
+                    resultado['error'] = 'expired'
+                except TokenBackendError:
+                    payload = {}
+                    resultado['error'] = 'invalid'
+
+                resultado['token_type'] = payload.get(api_settings.TOKEN_TYPE_CLAIM)
+                resultado['exp'] = self._exp(payload)
+                resultados.append(resultado)
+                jtis.append(payload.get(api_settings.JTI_CLAIM) if resultado['valid'] else None)
+
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                en_blacklist = blacklisted_jtis([jti for jti in jtis if jti])
+                for resultado, jti in zip(resultados, jtis):
+                    if jti in en_blacklist:
+                        resultado.update(valid=False, error='blacklisted', blacklisted=True)
+
+            return SuccessResponse.ok(data=resultados)
+
+        except Exception as e:
+            return ErrorResponse.server_error()
@@ -1,13 +1,37 @@
-from ..serializers import UsuarioSerializer, PasswordSerializer
+import csv
+import json
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+from ..serializers import UsuarioSerializer, PasswordSerializer, BulkUsuarioSerializer
 from ..responses import SuccessResponse, ErrorResponse
+from ..pagination import KeysetPaginator, CursorInvalido
+from ..cache import UsuarioCache
+from ..hashing import hash_passwords
+from ..search import filter_by_prefix
+from ..conditional import build_etag, latest
+from ..representations import UsuarioRepresentation
+from ..backends import invalidate_usuario_activo
 
 
 class UsuarioService:
+    EXPORT_FORMATOS = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv',
+    }
 
     def __init__(self):
         self._model = UsuarioSerializer.Meta.model
         self._serializer_class = UsuarioSerializer
         self._queryset = None
+        self._cache = UsuarioCache()
+        # versiones (updated_at de usuario y perfil) leídas por get_user_version, para validar el cache
+        self._versiones = {}
 
     def _get_object(self, id: int):
         try:
@@ -15,7 +39,7 @@ class UsuarioService:
             if int != type(id):
                 raise ValueError(f"Id de tipo invalido")
 
-            usuario = self._model.objects.get(pk=id, is_active=True)
+            usuario = self._model.objects.select_related('perfil').get(pk=id, is_active=True)
             return usuario
 
         except self._model.DoesNotExist:
@@ -40,27 +64,263 @@ class UsuarioService:
         data = self._serializer_class(instance=user).data
         return SuccessResponse.ok(data=data)
 
-    def list_all_users(self):
+    def get_users_version(self, cursor: str = None, page_size=None, base_url: str = None, fields: str = None):
+        """
+        Calcula el ETag de una página del listado, consultando solo ids y updated_at (usuario y perfil),
+        sin serializar. No hay fecha de última modificación: si un usuario sale de la página (eliminado o
+        desactivado) la fecha más reciente de la página no avanza, así que solo el ETag detecta el cambio.
+
+        :return: (etag, None) o None si los parámetros son inválidos
+        """
+        try:
+            fields = self._serializer_class.parse_fields(fields)
+            queryset = self._model.objects.filter(is_active=True, is_superuser=False).select_related('perfil').only(
+                'id', 'updated_at', 'perfil__updated_at'
+            )
+            paginator = KeysetPaginator(page_size)
+            usuarios, next_cursor, prev_cursor = paginator.paginate(queryset, cursor)
+        except (ValidationError, CursorInvalido, ValueError):
+            return None
+
+        # los links de la respuesta dependen de base_url y de los cursores
+        partes = [sorted(fields) if fields else None, base_url, next_cursor, prev_cursor]
+        for usuario in usuarios:
+            perfil_updated_at = usuario.perfil.updated_at if hasattr(usuario, 'perfil') else None
+            partes += [usuario.id, usuario.updated_at, perfil_updated_at]
+
+        return build_etag(*partes), None
+
+    def get_user_version(self, id: int, fields: str = None):
+        """
+        Calcula el ETag y la fecha de última modificación de un usuario con una consulta por clave primaria.
+
+        :return: (etag, last_modified) o None si el usuario no existe o los parámetros son inválidos
+        """
         try:
-            usuarios = self._get_queryset()
-            usuarios_serializer = self._serializer_class
-            data_ususarios = usuarios_serializer(usuarios, many=True)
-            return SuccessResponse.ok(data=data_ususarios.data)
+            id = int(id)
+            fields = self._serializer_class.parse_fields(fields)
+            version = self._model.objects.filter(pk=id, is_active=True).values_list(
+                'updated_at', 'perfil__updated_at'
+            ).first()
+        except (ValidationError, ValueError, TypeError):
+            return None
+
+        if version is None:
+            return None
+
+        self._versiones[id] = version
+        updated_at, perfil_updated_at = version
+        etag = build_etag(sorted(fields) if fields else None, id, updated_at, perfil_updated_at)
+        return etag, latest(updated_at, perfil_updated_at)
+
+    def list_all_users(self, cursor: str = None, page_size=None, base_url: str = None, fields: str = None):
+        try:
+            fields = self._serializer_class.parse_fields(fields)
+
+            # filas de values() con solo las columnas pedidas; el perfil se une en la misma consulta si se pidió
+            representation = UsuarioRepresentation.for_fields(fields)
+            queryset = representation.values(self._get_queryset())
+
+            paginator = KeysetPaginator(page_size)
+            usuarios, next_cursor, prev_cursor = paginator.paginate(queryset, cursor)
+
+            data_ususarios = representation.to_list(usuarios)
+            links = paginator.get_links(base_url, next_cursor, prev_cursor)
+            return SuccessResponse.ok(data=data_ususarios, links=links)
+        except ValidationError as e:
+            return ErrorResponse.bad_request(message='Datos inválidos', errors=e.detail)
+        except (CursorInvalido, ValueError) as e:
+            return ErrorResponse.bad_request(message='Parámetros de paginación inválidos', errors=str(e))
+        except Exception as e:
+            return ErrorResponse.server_error()
+
+    def search_users(self, q: str, cursor: str = None, page_size=None, base_url: str = None, fields: str = None):
+        """
+        Busca usuarios cuyo username o email comience con 'q', sin distinguir mayúsculas.
+        El resultado se pagina igual que el listado de usuarios.
+        """
+        try:
+            q = (q or '').strip()
+            min_length = settings.USUARIO_SEARCH_MIN_LENGTH
+            if len(q) < min_length:
+                return ErrorResponse.bad_request(message=f'La búsqueda debe tener al menos {min_length} caracteres')
+
+            fields = self._serializer_class.parse_fields(fields)
+
+            representation = UsuarioRepresentation.for_fields(fields)
+            queryset = representation.values(filter_by_prefix(self._get_queryset(), q))
+
+            paginator = KeysetPaginator(page_size)
+            usuarios, next_cursor, prev_cursor = paginator.paginate(queryset, cursor)
+
+            data_usuarios = representation.to_list(usuarios)
+            links = paginator.get_links(base_url, next_cursor, prev_cursor)
+            return SuccessResponse.ok(data=data_usuarios, links=links)
+        except ValidationError as e:
+            return ErrorResponse.bad_request(message='Datos inválidos', errors=e.detail)
+        except (CursorInvalido, ValueError) as e:
+            return ErrorResponse.bad_request(message='Parámetros de paginación inválidos', errors=str(e))
+        except Exception as e:
+            return ErrorResponse.server_error()
+
+    def _export_queryset(self):
+        # LEFT JOIN con perfil, solo las columnas que se exportan
+        return self._model.objects.filter(is_active=True, is_superuser=False).order_by('id').values_list(
+            'id', 'username', 'email', 'perfil__id', 'perfil__nombre', 'perfil__apellido',
+            'perfil__fecha_nacimiento'
+        )
+
+    def _export_lineas(self, formato: str):
+        """
+        Encabezado (o None) y función que convierte una fila de la exportación en su línea, según el formato.
+        """
+        if formato not in self.EXPORT_FORMATOS:
+            raise ValueError(f"Formato de exportación inválido: {formato}")
+
+        if formato == 'csv':
+            class _Buffer:
+                # csv.writer escribe en este buffer y se devuelve la línea sin acumularla
+                def write(self, value):
+                    return value
+
+            writer = csv.writer(_Buffer())
+            encabezado = writer.writerow(['id', 'username', 'email', 'nombre', 'apellido', 'fecha_nacimiento'])
+
+            def linea_csv(fila):
+                id, username, email, perfil_id, nombre, apellido, fecha_nacimiento = fila
+                return writer.writerow([id, username, email, nombre, apellido, fecha_nacimiento])
+
+            return encabezado, linea_csv
+
+        return None, self._linea_ndjson
+
+    @staticmethod
+    def _linea_ndjson(fila):
+        id, username, email, perfil_id, nombre, apellido, fecha_nacimiento = fila
+        usuario = {'id': id, 'username': username, 'email': email}
+        if perfil_id is not None:
+            usuario['perfil'] = {
+                'nombre': nombre,
+                'apellido': apellido,
+                'fecha_nacimiento': fecha_nacimiento
+            }
+        return json.dumps(usuario, cls=DjangoJSONEncoder) + '\n'
+
+    def iter_export(self, formato: str, chunk_size: int = None):
+        """
+        Genera las líneas de la exportación de usuarios, leyendo la base de datos por bloques
+        (cursor del lado del servidor en PostgreSQL), para que la memoria no dependa de la cantidad de usuarios.
+
+        :param formato: 'ndjson' o 'csv'
+        :param chunk_size: cantidad de filas por bloque
+        """
+        encabezado, linea = self._export_lineas(formato)
+        chunk_size = chunk_size or settings.USUARIO_EXPORT_CHUNK_SIZE
+
+        if encabezado is not None:
+            yield encabezado
+        for fila in self._export_queryset().iterator(chunk_size=chunk_size):
+            yield linea(fila)
+
+    async def aiter_export(self, formato: str, chunk_size: int = None):
+        """
+        Versión asíncrona de iter_export, para servir la exportación bajo ASGI: con un generador sincrónico
+        Django lo consume entero antes de enviar la respuesta.
+        """
+        encabezado, linea = self._export_lineas(formato)
+        chunk_size = chunk_size or settings.USUARIO_EXPORT_CHUNK_SIZE
+
+        # cada bloque se lee en el thread de la conexión (no con aiterator(), que con values_list() ejecuta la
+        # consulta dentro del event loop)
+        filas = self._export_queryset().iterator(chunk_size=chunk_size)
+        siguiente_bloque = sync_to_async(lambda: list(islice(filas, chunk_size)))
+
+        if encabezado is not None:
+            yield encabezado
+        while bloque := await siguiente_bloque():
+            for fila in bloque:
+                yield linea(fila)
+
+    def export_users(self, formato: str = 'ndjson', asynchronous: bool = False):
+        """
+        :param asynchronous: True si el request se atiende bajo ASGI (el cuerpo se genera con aiter_export)
+        """
+        try:
+            if formato not in self.EXPORT_FORMATOS:
+                message = f"Formato inválido, opciones: {', '.join(self.EXPORT_FORMATOS)}"
+                return ErrorResponse.bad_request(message=message)
+
+            lineas = self.aiter_export(formato) if asynchronous else self.iter_export(formato)
+            response = StreamingHttpResponse(lineas, content_type=self.EXPORT_FORMATOS[formato])
+            response['Content-Disposition'] = f'attachment; filename="usuarios.{formato}"'
+            return response
         except Exception as e:
             return ErrorResponse.server_error()
 
-    def list_one_user(self, id: int):
+    def list_one_user(self, id: int, fields: str = None):
         try:
             # convertir id a int
             id = int(id)
 
-            usuario = self._get_object(id)
+            fields = self._serializer_class.parse_fields(fields)
+
+            # con la versión que ya leyó get_user_version, el cuerpo no puede ser más viejo que el ETag
+            version = self._versiones.get(id)
+            data_usuario = self._cache.get(id, version)
+            if data_usuario is not None:
+                if fields is not None:
+                    data_usuario = {field: value for field, value in data_usuario.items() if field in fields}
+                return SuccessResponse.ok(data=data_usuario)
+
+            representation = UsuarioRepresentation.for_fields(fields)
+            usuario = representation.values(self._model.objects.filter(pk=id, is_active=True)).first()
             if usuario:
-                usuario_serializer = self._serializer_class(usuario)
-                data_usuario = usuario_serializer.data
+                data_usuario = representation.to_representation(usuario)
+                # solo se guarda en cache la representación completa
+                if fields is None:
+                    self._cache.set(id, data_usuario, version)
                 return SuccessResponse.ok(data=data_usuario)
             else:
                 return ErrorResponse.user_not_found()
+        except ValidationError as e:
+            return ErrorResponse.bad_request(message='Datos inválidos', errors=e.detail)
+        except Exception as e:
+            return ErrorResponse.server_error()
+
+    def list_users_by_ids(self, ids: list, fields: str = None):
+        """
+        Retorna los usuarios de una lista de ids con una única consulta.
+
+        :param ids: lista de ids
+        :param fields: campos de la representación (opcional)
+        :return: usuarios por id y la lista de ids no encontrados
+        """
+        try:
+            if not isinstance(ids, list) or not ids:
+                return ErrorResponse.bad_request(message='Se esperaba una lista de ids')
+
+            max_ids = settings.USUARIO_BATCH_MAX_IDS
+            if len(ids) > max_ids:
+                return ErrorResponse.bad_request(message=f'No se pueden consultar más de {max_ids} ids')
+
+            try:
+                ids = list(dict.fromkeys(int(id) for id in ids))
+            except (TypeError, ValueError):
+                return ErrorResponse.bad_request(message='Los ids deben ser números enteros')
+
+            fields = self._serializer_class.parse_fields(fields)
+
+            representation = UsuarioRepresentation.for_fields(fields)
+            usuarios = representation.values(self._get_queryset().filter(id__in=ids))
+            data_usuarios = {
+                usuario['id']: representation.to_representation(usuario)
+                for usuario in usuarios
+            }
+            faltantes = [id for id in ids if id not in data_usuarios]
+
+            return SuccessResponse.ok(data={'usuarios': data_usuarios, 'faltantes': faltantes})
+        except ValidationError as e:
+            return ErrorResponse.bad_request(message='Datos inválidos', errors=e.detail)
         except Exception as e:
             return ErrorResponse.server_error()
 
@@ -83,6 +343,81 @@ class UsuarioService:
         except Exception as e:
             return ErrorResponse.server_error()
 
+    def _validate_bulk_users(self, usuarios: list):
+        validos, errores = [], []
+        usernames, emails = {}, {}
+
+        for index, usuario_data in enumerate(usuarios):
+            if not isinstance(usuario_data, dict):
+                errores.append({'index': index, 'errors': 'Se esperaba un objeto'})
+                continue
+
+            serializer = BulkUsuarioSerializer(data=usuario_data)
+            if not serializer.is_valid():
+                errores.append({'index': index, 'errors': serializer.errors})
+                continue
+
+            data = serializer.validated_data
+            data['email'] = self._model.objects.normalize_email(data['email'])
+
+            # duplicados dentro del mismo lote
+            if data['username'] in usernames or data['email'] in emails:
+                errores.append({'index': index, 'errors': 'Usuario duplicado en el lote'})
+                continue
+
+            usernames[data['username']] = index
+            emails[data['email']] = index
+            validos.append((index, data))
+
+        # duplicados contra la base de datos, una consulta por campo
+        existentes = set()
+        for username in self._model.objects.filter(username__in=usernames).values_list('username', flat=True):
+            existentes.add(usernames[username])
+        for email in self._model.objects.filter(email__in=emails).values_list('email', flat=True):
+            existentes.add(emails[email])
+
+        for index in sorted(existentes):
+            errores.append({'index': index, 'errors': 'Ya existe un usuario con ese username o email'})
+
+        validos = [(index, data) for index, data in validos if index not in existentes]
+        errores.sort(key=lambda error: error['index'])
+        return validos, errores
+
+    def bulk_create_users(self, usuarios: list):
+        """
+        Crea usuarios en lote. Las contraseñas se hashean en paralelo y los usuarios válidos
+        se insertan con bulk_create dentro de una única transacción.
+
+        :param usuarios: lista de {username, password, email}
+        :return: cantidad de usuarios creados y los errores de validación por índice
+        """
+        try:
+            if not isinstance(usuarios, list) or not usuarios:
+                return ErrorResponse.bad_request(message='Se esperaba una lista de usuarios')
+
+            max_size = settings.USUARIO_BULK_MAX_SIZE
+            if len(usuarios) > max_size:
+                return ErrorResponse.bad_request(message=f'El lote no puede superar los {max_size} usuarios')
+
+            validos, errores = self._validate_bulk_users(usuarios)
+            if not validos:
+                return ErrorResponse.bad_request(message='Datos inválidos', errors=errores)
+
+            hashes = hash_passwords([data['password'] for index, data in validos])
+            nuevos = [
+                self._model(username=data['username'], email=data['email'], password=password)
+                for (index, data), password in zip(validos, hashes)
+            ]
+
+            with transaction.atomic():
+                self._model.objects.bulk_create(nuevos, batch_size=settings.USUARIO_BULK_BATCH_SIZE)
+
+            message = 'Usuarios creados'
+            return SuccessResponse.created(message=message, data={'creados': len(nuevos), 'errores': errores})
+
+        except Exception as e:
+            return ErrorResponse.server_error()
+
     def set_password_user(self, id: int, password: str, password2: str):
         try:
             # convertir id a int
@@ -101,6 +436,7 @@ class UsuarioService:
 
                 user.set_password(password_serializer.validated_data['password'])
                 user.save()
+                self._cache.invalidate(id)
                 message = 'Contraseña Actualizada'
                 return SuccessResponse.ok(message=message)
             else:
@@ -135,6 +471,7 @@ class UsuarioService:
                 # la contraseña es correcta
                 user.email = serializer.validated_data['email']
                 user.save()
+                self._cache.invalidate(id)
                 message = 'Email Actualizado'
                 return SuccessResponse.ok(message=message, data=serializer.validated_data['email'])
             else:
@@ -162,6 +499,7 @@ class UsuarioService:
 
             user.username = serializer.validated_data['username']
             user.save()
+            self._cache.invalidate(id)
             message = 'Username Actualizado'
             return SuccessResponse.ok(message=message, data=serializer.validated_data)
 
@@ -173,8 +511,12 @@ class UsuarioService:
             # convertir id a int
             id = int(id)
 
-            updated_rows = self._model.objects.filter(id=id, is_active=True, is_superuser=False).update(is_active=False)
+            updated_rows = self._model.objects.filter(id=id, is_active=True, is_superuser=False).update(
+                is_active=False, updated_at=timezone.now()
+            )
             if updated_rows == 1:
+                self._cache.invalidate(id)
+                invalidate_usuario_activo(id)
                 message = 'Usuario eliminado'
                 return SuccessResponse.ok(message=message)
             return ErrorResponse.user_not_found()
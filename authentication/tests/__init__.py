@@ -4,3 +4,7 @@ from .test_usuario_api import *
 from .test_login_api import *
 from .test_usuario_service import *
 from .test_perfil_service import *
+from .test_representations import *
+from .test_keyring import *
+from .test_blacklist import *
+from .test_claims import *
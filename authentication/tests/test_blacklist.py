@@ -0,0 +1,155 @@
+from io import StringIO
+from unittest import mock
+from datetime import timedelta
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from ..blacklist import BloomFilter, blacklist_filter, is_blacklisted
+from ..models import Usuario
+
+
+@override_settings(JWT_BLACKLIST_FILTER_ENABLED=True, JWT_BLACKLIST_FILTER_SYNC_INTERVAL=60)
+class TestBlacklistFilter(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.url_api_login = '/authentication/api/token/'
+        self.url_api_refresh = '/authentication/api/token/refresh/'
+        self.url_api_verify = '/authentication/api/token/verify/'
+        blacklist_filter.reset()
+
+        self.user = Usuario.objects.create_user(username='test', password='test1234', email='test@mail.com')
+        self.refresh = self.client.post(
+            path=self.url_api_login,
+            data={'email': 'test@mail.com', 'password': 'test1234'}
+        ).json()['refresh']
+
+    def tearDown(self):
+        blacklist_filter.reset()
+
+    def _crear_token(self, jti, expires_at, blacklisted=False):
+        token = OutstandingToken.objects.create(
+            user=self.user, jti=jti, token=jti, created_at=timezone.now(), expires_at=expires_at
+        )
+        if blacklisted:
+            BlacklistedToken.objects.create(token=token)
+        return token
+
+    def test_bloom_filter(self):
+        """
+        Caso de éxito:
+            - Los valores agregados siempre están, y la tasa de falsos positivos queda cerca de la configurada
+        """
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+
+        self.assertTrue(all(f'jti-{i}' in bloom for i in range(1000)))
+        falsos_positivos = sum(f'otro-{i}' in bloom for i in range(10000))
+        self.assertLess(falsos_positivos, 300)
+
+    def test_sin_consulta_si_no_esta(self):
+        """
+        Caso de éxito:
+            - Con el filtro sincronizado, un jti que no está en la blacklist se descarta sin consultar la base
+        """
+        self.assertFalse(is_blacklisted('jti-inexistente'))
+        with self.assertNumQueries(0):
+            self.assertFalse(is_blacklisted('otro-jti-inexistente'))
+
+    def test_refresh_rotado(self):
+        """
+        Caso de éxito:
+            - El refresh token se rota
+        Caso de fallo:
+            - El refresh token ya rotado se rechaza, aunque el filtro se haya construido antes de rotarlo
+        """
+        self.assertFalse(is_blacklisted('jti-inexistente'))
+
+        response = self.client.post(path=self.url_api_refresh, data={'refresh': self.refresh})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(path=self.url_api_refresh, data={'refresh': self.refresh})
+        self.assertEqual(response.status_code, 401)
+
+        response = self.client.post(path=self.url_api_verify, data={'token': self.refresh})
+        self.assertEqual(response.status_code, 400)
+
+    def test_sincronizacion_incremental(self):
+        """
+        Caso de éxito:
+            - Un token agregado a la blacklist por otro proceso (sin pasar por el filtro) se ve al sincronizar
+        """
+        self.assertFalse(is_blacklisted('jti-inexistente'))
+        blacklist_filter.reset()
+        self.assertFalse(is_blacklisted('jti-inexistente'))
+
+        # otro proceso: el insert no actualiza el filtro de este proceso
+        token = OutstandingToken.objects.create(user=self.user, jti='jti-externo', token='x',
+                                                created_at=timezone.now(),
+                                                expires_at=timezone.now() + timedelta(days=1))
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token)])
+        self.assertFalse(is_blacklisted('jti-externo'))
+
+        with override_settings(JWT_BLACKLIST_FILTER_SYNC_INTERVAL=0):
+            self.assertTrue(is_blacklisted('jti-externo'))
+
+    def test_sincronizacion_fuera_de_orden(self):
+        """
+        Caso de éxito:
+            - Un BlacklistedToken con un id menor al último visto, confirmado después de sincronizar, se ve igual
+            - Releer los ids ya vistos no los vuelve a contar en el filtro
+        """
+        expira = timezone.now() + timedelta(days=1)
+        ultimo = OutstandingToken.objects.create(user=self.user, jti='jti-ultimo', token='x',
+                                                 created_at=timezone.now(), expires_at=expira)
+        tardio = OutstandingToken.objects.create(user=self.user, jti='jti-tardio', token='y',
+                                                 created_at=timezone.now(), expires_at=expira)
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(id=1000, token=ultimo)])
+
+        blacklist_filter.reset()
+        self.assertTrue(is_blacklisted('jti-ultimo'))
+        count = blacklist_filter._filter.count
+
+        # id asignado antes que el 1000 pero confirmado después de la sincronización anterior
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(id=990, token=tardio)])
+        with override_settings(JWT_BLACKLIST_FILTER_SYNC_INTERVAL=0):
+            self.assertTrue(is_blacklisted('jti-tardio'))
+        self.assertEqual(blacklist_filter._filter.count, count + 1)
+
+    def test_reconstruccion_sin_lock(self):
+        """
+        Caso de éxito:
+            - La reconstrucción lee la tabla sin tomar el lock del filtro, y no pierde los tokens agregados mientras tanto
+        """
+        self.assertFalse(is_blacklisted('jti-inexistente'))
+        build = blacklist_filter._build
+
+        def build_sin_lock():
+            self.assertFalse(blacklist_filter._lock.locked())
+            # un token rotado en este proceso durante la reconstrucción
+            blacklist_filter.add('jti-durante')
+            return build()
+
+        with mock.patch.object(blacklist_filter, '_build', side_effect=build_sin_lock) as mock_build, \
+                override_settings(JWT_BLACKLIST_FILTER_REBUILD_INTERVAL=0):
+            self.assertFalse(is_blacklisted('jti-inexistente'))
+        mock_build.assert_called_once()
+        self.assertTrue(blacklist_filter.might_contain('jti-durante'))
+
+    def test_prune_tokens(self):
+        """
+        Caso de éxito:
+            - Se eliminan por bloques los tokens vencidos y sus entradas en la blacklist
+            - Los tokens vigentes se conservan
+        """
+        vencido = timezone.now() - timedelta(days=1)
+        for i in range(5):
+            self._crear_token(f'vencido-{i}', vencido, blacklisted=i % 2 == 0)
+        vigente = self._crear_token('vigente', timezone.now() + timedelta(days=1), blacklisted=True)
+
+        call_command('prune_tokens', chunk_size=2, pause=0, stdout=StringIO())
+
+        self.assertFalse(OutstandingToken.objects.filter(jti__startswith='vencido-').exists())
+        self.assertFalse(BlacklistedToken.objects.filter(token__jti__startswith='vencido-').exists())
+        self.assertTrue(BlacklistedToken.objects.filter(token=vigente).exists())
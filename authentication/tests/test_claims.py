@@ -0,0 +1,176 @@
+from django.contrib.auth.models import Group, Permission
+from django.test import TestCase, Client, RequestFactory, override_settings
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from ..backends import UsuarioJWTAuthentication, usuarios_activos
+from ..claims import encode_permisos, decode_permisos, versiones_permisos
+from ..models import Usuario
+
+
+@override_settings(JWT_PERMISSION_CLAIMS=True)
+class TestPermissionClaims(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.url_api_login = '/authentication/api/token/'
+        self.url_api_refresh = '/authentication/api/token/refresh/'
+        versiones_permisos.clear()
+        usuarios_activos.clear()
+
+        self.user = Usuario.objects.create_user(username='test', password='test1234', email='test@mail.com')
+        self.grupo = Group.objects.create(name='editores')
+        self.ver = Permission.objects.get(codename='view_usuario')
+        self.cambiar = Permission.objects.get(codename='change_usuario')
+        self.borrar = Permission.objects.get(codename='delete_usuario')
+
+        self.user.user_permissions.add(self.ver)
+        self.grupo.permissions.add(self.cambiar)
+        self.user.groups.add(self.grupo)
+
+    def _login(self):
+        return self.client.post(
+            path=self.url_api_login,
+            data={'email': 'test@mail.com', 'password': 'test1234'}
+        ).json()
+
+    @staticmethod
+    def _autenticar(access):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        user, _ = UsuarioJWTAuthentication().authenticate(request)
+        return user
+
+    def test_bitset(self):
+        """
+        Caso de éxito: el bitset codifica y decodifica el mismo conjunto de ids
+        """
+        ids = {1, 7, 64, 300}
+        self.assertEqual(decode_permisos(encode_permisos(ids)), ids)
+        self.assertEqual(decode_permisos(encode_permisos([])), set())
+
+    def test_permisos_desde_claims(self):
+        """
+        Caso de éxito: los permisos propios y de los grupos se resuelven con el token, sin consultas
+        """
+        tokens = self._login()
+
+        user = self._autenticar(tokens['access'])
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm('authentication.view_usuario'))
+            self.assertTrue(user.has_perm('authentication.change_usuario'))
+            self.assertFalse(user.has_perm('authentication.delete_usuario'))
+
+        with self.settings(JWT_STATELESS_AUTH=True):
+            user = self._autenticar(tokens['access'])
+            with self.assertNumQueries(0):
+                self.assertTrue(user.has_perms(['authentication.view_usuario', 'authentication.change_usuario']))
+                self.assertFalse(user.has_perm('authentication.delete_usuario'))
+                self.assertTrue(user.has_module_perms('authentication'))
+
+    def test_cambio_de_permisos(self):
+        """
+        Caso de fallo: al cambiar los permisos del usuario o de su grupo, el token anterior se rechaza
+        """
+        tokens = self._login()
+        self.grupo.permissions.add(self.borrar)
+
+        with self.assertRaises(AuthenticationFailed):
+            self._autenticar(tokens['access'])
+        with self.settings(JWT_STATELESS_AUTH=True), self.assertRaises(AuthenticationFailed):
+            self._autenticar(tokens['access'])
+
+        """
+        Caso de éxito: al renovar el token, el nuevo lleva los permisos actuales
+        """
+        response = self.client.post(path=self.url_api_refresh, data={'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+        user = self._autenticar(response.json()['access'])
+        self.assertTrue(user.has_perm('authentication.delete_usuario'))
+
+        self.user.user_permissions.remove(self.ver)
+        with self.assertRaises(AuthenticationFailed):
+            self._autenticar(response.json()['access'])
+
+        response = self.client.post(path=self.url_api_refresh, data={'refresh': response.json()['refresh']})
+        self.assertEqual(response.status_code, 200)
+        user = self._autenticar(response.json()['access'])
+        self.assertFalse(user.has_perm('authentication.view_usuario'))
+
+    def test_borrado_y_privilegios(self):
+        """
+        Caso de fallo: borrar un grupo o un permiso del usuario rechaza el token anterior
+        """
+        tokens = self._login()
+        self.grupo.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self._autenticar(tokens['access'])
+
+        tokens = self._login()
+        Permission.objects.filter(pk=self.ver.pk).delete()
+        with self.settings(JWT_STATELESS_AUTH=True), self.assertRaises(AuthenticationFailed):
+            self._autenticar(tokens['access'])
+
+        """
+        Caso de fallo: cambiar is_staff o is_superuser rechaza el token anterior
+        """
+        for campo in ('is_staff', 'is_superuser'):
+            tokens = self._login()
+            user = Usuario.objects.get(pk=self.user.pk)
+            setattr(user, campo, True)
+            user.save()
+            with self.assertRaises(AuthenticationFailed):
+                self._autenticar(tokens['access'])
+
+        """
+        Caso de éxito: guardar una instancia cargada antes del cambio no vuelve atrás la versión,
+        y guardar sin cambiar privilegios no invalida los tokens
+        """
+        anterior = Usuario.objects.get(pk=self.user.pk)
+        self.user.user_permissions.add(self.borrar)
+        version = Usuario.objects.get(pk=self.user.pk).permisos_version
+        self.assertLess(anterior.permisos_version, version)
+        anterior.save()
+        self.assertEqual(Usuario.objects.get(pk=self.user.pk).permisos_version, version)
+
+        tokens = self._login()
+        anterior.username = 'otro'
+        anterior.save()
+        self.assertIsNotNone(self._autenticar(tokens['access']))
+
+    def test_refresh_tras_quitar_staff(self):
+        """
+        Caso de fallo: a un admin que deja de ser staff se le rechaza el token anterior, y el que obtiene al
+        renovarlo ya no dice is_staff, aunque el refresh token sea del login como admin
+        """
+        self.user.is_staff = True
+        self.user.save()
+        tokens = self._login()
+
+        with self.settings(JWT_STATELESS_AUTH=True, JWT_ACTIVE_CACHE_TTL=0):
+            headers = {'Authorization': f'Bearer {tokens["access"]}'}
+            response = self.client.get(path='/authentication/api/token/metrics/', headers=headers)
+            self.assertEqual(response.status_code, 200)
+
+            self.user.is_staff = False
+            self.user.save()
+            response = self.client.get(path='/authentication/api/token/metrics/', headers=headers)
+            self.assertEqual(response.status_code, 401)
+
+            response = self.client.post(path=self.url_api_refresh, data={'refresh': tokens['refresh']})
+            self.assertEqual(response.status_code, 200)
+            headers = {'Authorization': f'Bearer {response.json()["access"]}'}
+            response = self.client.get(path='/authentication/api/token/metrics/', headers=headers)
+            self.assertEqual(response.status_code, 403)
+
+    def test_sin_permission_claims(self):
+        """
+        Caso de éxito: sin JWT_PERMISSION_CLAIMS, guardar un usuario o cambiar permisos no hace consultas extra
+        ni cambia la versión de permisos
+        """
+        user = Usuario.objects.get(pk=self.user.pk)
+        version = user.permisos_version
+        with self.settings(JWT_PERMISSION_CLAIMS=False):
+            user.is_staff = True
+            with self.assertNumQueries(1):
+                user.save()
+            self.grupo.permissions.add(self.borrar)
+            self.user.user_permissions.remove(self.ver)
+            Group.objects.create(name='otro').delete()
+        self.assertEqual(Usuario.objects.get(pk=self.user.pk).permisos_version, version)
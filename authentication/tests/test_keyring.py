@@ -0,0 +1,193 @@
+import os
+import tempfile
+from io import StringIO
+from datetime import datetime, timedelta, timezone
+import jwt
+from cryptography.hazmat.primitives import serialization
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+from .. import keyring as keyring_module
+from ..keyring import generate_private_key, get_keyring, preload_keyring, reset_keyring, KeyRingError
+from ..models import Usuario
+
+
+class TestKeyRing(TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.user = Usuario.objects.create(username='test', email='test@mail.com')
+        ahora = datetime.now(timezone.utc)
+
+        self.claves = {
+            'rsa-viejo': self._crear_clave('rsa-viejo', 'RS256', not_before=ahora - timedelta(days=30)),
+            'ec-actual': self._crear_clave('ec-actual', 'ES256', not_before=ahora - timedelta(days=1)),
+            'ed-futuro': self._crear_clave('ed-futuro', 'EdDSA', not_before=ahora + timedelta(days=1)),
+            'rsa-retirado': self._crear_clave('rsa-retirado', 'RS256', not_after=ahora - timedelta(days=1)),
+        }
+
+    def tearDown(self):
+        self.directorio.cleanup()
+        reset_keyring()
+
+    def _crear_clave(self, kid, algorithm, not_before=None, not_after=None):
+        private_key = generate_private_key(algorithm)
+        path = os.path.join(self.directorio.name, f'{kid}.pem')
+        with open(path, 'wb') as archivo:
+            archivo.write(private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            ))
+        return {
+            'kid': kid,
+            'algorithm': algorithm,
+            'private_key_file': path,
+            'not_before': not_before.isoformat() if not_before else None,
+            'not_after': not_after.isoformat() if not_after else None,
+        }
+
+    def _firmar(self, kid):
+        key = get_keyring()._keys[kid]
+        token = AccessToken.for_user(self.user)
+        return jwt.encode(token.payload, key.private_key, algorithm=key.algorithm, headers={'kid': kid})
+
+    def test_firma_con_la_clave_vigente(self):
+        """
+        Caso de éxito: se firma con la clave de not_before más reciente ya alcanzado, y el kid va en el header
+        """
+        with self.settings(JWT_KEYS=list(self.claves.values())):
+            token = str(AccessToken.for_user(self.user))
+            header = jwt.get_unverified_header(token)
+            self.assertEqual(header['kid'], 'ec-actual')
+            self.assertEqual(header['alg'], 'ES256')
+            self.assertEqual(AccessToken(token)['user_id'], str(self.user.id))
+
+            # las claves parseadas se reutilizan
+            self.assertIs(get_keyring(), get_keyring())
+
+    def test_verifica_por_kid(self):
+        """
+        Caso de éxito: un token firmado con una clave anterior sigue siendo válido
+        """
+        with self.settings(JWT_KEYS=list(self.claves.values())):
+            AccessToken(self._firmar('rsa-viejo'))
+            AccessToken(self._firmar('ed-futuro'))
+
+            """
+            Caso de fallo: clave retirada, kid desconocido
+            """
+            with self.assertRaises(TokenError):
+                AccessToken(self._firmar('rsa-retirado'))
+
+            token = AccessToken.for_user(self.user)
+            key = get_keyring().signing_key()
+            desconocido = jwt.encode(token.payload, key.private_key, algorithm=key.algorithm, headers={'kid': 'otro'})
+            with self.assertRaises(TokenError):
+                AccessToken(desconocido)
+
+    def test_rotacion_programada(self):
+        """
+        Caso de éxito: al llegar el not_before de una clave nueva, pasa a ser la clave de firma
+        """
+        with self.settings(JWT_KEYS=list(self.claves.values())):
+            keyring = get_keyring()
+            manana = datetime.now(timezone.utc) + timedelta(days=2)
+            self.assertEqual(keyring.signing_key().kid, 'ec-actual')
+            self.assertEqual(keyring.signing_key(now=manana).kid, 'ed-futuro')
+
+    def test_jwks(self):
+        """
+        Caso de éxito: el JWKS publica las claves vigentes y programadas, y con él se verifica un token localmente
+        """
+        with self.settings(JWT_KEYS=list(self.claves.values())):
+            response = self.client.get('/authentication/api/.well-known/jwks.json')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('max-age', response['Cache-Control'])
+
+            jwks = jwt.PyJWKSet.from_dict(response.json())
+            self.assertEqual(sorted(key.key_id for key in jwks.keys), ['ec-actual', 'ed-futuro', 'rsa-viejo'])
+
+            token = str(AccessToken.for_user(self.user))
+            jwk = jwks[jwt.get_unverified_header(token)['kid']]
+            self.assertEqual(jwt.decode(token, jwk.key, algorithms=[jwk.algorithm_name])['user_id'], str(self.user.id))
+
+            """
+            Caso de éxito: con el mismo ETag responde 304 sin cuerpo
+            """
+            response = self.client.get('/authentication/api/.well-known/jwks.json',
+                                       headers={'If-None-Match': response['ETag']})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+
+    def test_jwks_al_iniciar(self):
+        """
+        Caso de éxito: al iniciar, con los archivos de las claves presentes, el JWKS queda serializado
+        y el primer request no lee ninguna clave
+        """
+        with self.settings(JWT_KEYS=list(self.claves.values())):
+            preload_keyring()
+            keyring = keyring_module._keyring
+            self.assertIsNotNone(keyring)
+            self.assertEqual(len(keyring._jwks), 1)
+
+            response = self.client.get('/authentication/api/.well-known/jwks.json')
+            self.assertEqual(response.status_code, 200)
+            self.assertIs(keyring_module._keyring, keyring)
+            self.assertEqual(len(keyring._jwks), 1)
+
+            """
+            Caso de éxito: sin los archivos de las claves no se carga nada hasta el primer uso
+            """
+            reset_keyring()
+            with self.settings(JWT_KEYS=[{**self.claves['ec-actual'], 'private_key_file': 'no-existe.pem'}]):
+                preload_keyring()
+                self.assertIsNone(keyring_module._keyring)
+
+    def test_generate_jwt_keys(self):
+        """
+        Caso de éxito: el comando genera un par de claves consistente y el key ring lo carga en el primer uso
+        """
+        private_path = os.path.join(self.directorio.name, 'private.pem')
+        public_path = os.path.join(self.directorio.name, 'public.pem')
+        call_command('generate_jwt_keys', '--private', private_path, '--public', public_path,
+                     '--algorithm', 'ES256', stdout=StringIO())
+
+        config = {'kid': 'generada', 'algorithm': 'ES256', 'private_key_file': private_path,
+                  'public_key_file': public_path}
+        with self.settings(JWT_KEYS=[config]):
+            token = AccessToken.for_user(self.user)
+            self.assertEqual(AccessToken(str(token))['user_id'], str(self.user.id))
+
+        """
+        Caso de éxito: con --if-missing no se reemplaza una clave existente
+        """
+        with open(private_path, 'rb') as archivo:
+            contenido = archivo.read()
+        call_command('generate_jwt_keys', '--private', private_path, '--public', public_path, '--if-missing',
+                     stdout=StringIO())
+        with open(private_path, 'rb') as archivo:
+            self.assertEqual(archivo.read(), contenido)
+
+        """
+        Caso de éxito: con --if-missing, si falta la clave pública se genera a partir de la privada existente
+        """
+        with open(public_path, 'rb') as archivo:
+            publica = archivo.read()
+        os.remove(public_path)
+        call_command('generate_jwt_keys', '--private', private_path, '--public', public_path, '--if-missing',
+                     stdout=StringIO())
+        with open(private_path, 'rb') as archivo:
+            self.assertEqual(archivo.read(), contenido)
+        with open(public_path, 'rb') as archivo:
+            self.assertEqual(archivo.read(), publica)
+
+        """
+        Caso de fallo: sin --force no se pisa una clave existente; un archivo faltante da un error claro
+        """
+        with self.assertRaises(CommandError):
+            call_command('generate_jwt_keys', '--private', private_path, '--public', public_path, stdout=StringIO())
+
+        with self.settings(JWT_KEYS=[{**config, 'private_key_file': private_path + '.no'}]):
+            with self.assertRaisesMessage(KeyRingError, 'generate_jwt_keys'):
+                get_keyring()
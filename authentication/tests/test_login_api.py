@@ -1,5 +1,15 @@
-from django.test import TestCase, Client
+import json
+from datetime import timedelta
+from unittest import mock
+import jwt
+from asgiref.sync import async_to_sync
+from django.contrib.auth.signals import user_login_failed
+from django.test import TestCase, Client, RequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
 from ..models import Usuario, Perfil
+from ..backends import usuarios_activos, tokens_verificados
+from ..views import login_metrics, AsyncTokenObtainPairView
+from ..services.UsuarioService import UsuarioService
 
 
 # Create your tests here.
@@ -93,3 +103,266 @@ class TestLoginAPI(TestCase):
             headers={'Authorization': f'Bearer {token}'}
         )
         self.assertEquals(response.status_code, 200)
+
+    def test_api_stateless_auth(self):
+        """
+        Caso de exito: en modo sin estado, con el is_active en cache, la autenticacion no consulta la base de datos
+        """
+        usuarios_activos.clear()
+        data = dict(self.logged_user.json())
+        headers = {'Authorization': f'Bearer {data["access"]}'}
+
+        with self.settings(JWT_STATELESS_AUTH=True):
+            with self.assertNumQueries(1):  # is_active, se guarda en cache
+                response = self.client.get(path='/authentication/api/protected/', headers=headers)
+            self.assertEquals(response.status_code, 200)
+
+            with self.assertNumQueries(0):
+                response = self.client.get(path='/authentication/api/protected/', headers=headers)
+            self.assertEquals(response.status_code, 200)
+
+            """
+            Caso de fallo: el usuario eliminado deja de autenticarse
+            """
+            UsuarioService().delete_user(self.user.id)
+            response = self.client.get(path='/authentication/api/protected/', headers=headers)
+            self.assertEquals(response.status_code, 401)
+
+            """
+            Caso de fallo: un admin que deja de ser staff pierde el acceso al vencer el cache, aunque el token
+            (y los que se renueven con su refresh) diga is_staff
+            """
+            admin = Usuario.objects.create_user(username='admin', email='admin@mail.com', password='test1234')
+            admin.is_staff = True
+            admin.save()
+            tokens = self.client.post(path=self.url_api_login, data={'email': 'admin@mail.com', 'password': 'test1234'}).json()
+            headers_admin = {'Authorization': f'Bearer {tokens["access"]}'}
+            response = self.client.get(path='/authentication/api/token/metrics/', headers=headers_admin)
+            self.assertEquals(response.status_code, 200)
+
+            admin.is_staff = False
+            admin.save()
+            usuarios_activos.clear()
+            response = self.client.get(path='/authentication/api/token/metrics/', headers=headers_admin)
+            self.assertEquals(response.status_code, 403)
+
+            """
+            Caso de exito: sin verificar is_active no hay consultas
+            """
+            with self.settings(JWT_ACTIVE_CACHE_TTL=0):
+                with self.assertNumQueries(0):
+                    response = self.client.get(path='/authentication/api/protected/', headers=headers)
+                self.assertEquals(response.status_code, 200)
+
+    def _post_login(self, data, asynchronous=False, **kwargs):
+        if not asynchronous:
+            return self.client.post(path=self.url_api_login, data=data, **kwargs)
+        # la vista del login bajo ASGI
+        request = RequestFactory().post(self.url_api_login, data=data, **kwargs)
+        response = async_to_sync(AsyncTokenObtainPairView.as_view())(request)
+        response.json = lambda: json.loads(response.content)
+        return response
+
+    def test_api_login_pool(self):
+        login_metrics.clear()
+        for asynchronous in (False, True):
+            """
+            Caso de exito: login con JSON, el resultado queda en las métricas
+            """
+            response = self._post_login({'email': 'test@mail.com', 'password': 'test1234'}, asynchronous,
+                                        content_type='application/json')
+            self.assertEquals(response.status_code, 200)
+            self.assertIn('access', response.json())
+
+            """
+            Caso de fallo: contraseña incorrecta, usuario inexistente y campos faltantes
+            """
+            response = self._post_login({'email': 'test@mail.com', 'password': 'otra'}, asynchronous)
+            self.assertEquals(response.status_code, 401)
+            response = self._post_login({'email': 'no@mail.com', 'password': 'otra'}, asynchronous)
+            self.assertEquals(response.status_code, 401)
+            response = self._post_login({'email': 'test@mail.com'}, asynchronous)
+            self.assertEquals(response.status_code, 400)
+            self.assertIn('password', response.json())
+
+        """
+        Caso de fallo: con el pool saturado el login asíncrono se rechaza con 503
+        """
+        with self.settings(LOGIN_HASH_MAX_PENDING=0):
+            response = self._post_login({'email': 'test@mail.com', 'password': 'test1234'}, asynchronous=True)
+        self.assertEquals(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+        """
+        Caso de exito: un admin consulta las métricas de login; un usuario común no
+        """
+        response = self.client.get(
+            path='/authentication/api/token/metrics/',
+            headers={'Authorization': f'Bearer {self.logged_user.json()["access"]}'}
+        )
+        self.assertEquals(response.status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(
+            path='/authentication/api/token/metrics/',
+            headers={'Authorization': f'Bearer {self.logged_user.json()["access"]}'}
+        )
+        self.assertEquals(response.status_code, 200)
+        metricas = response.json()
+        self.assertEquals(metricas['count'], 6)
+        self.assertEquals(metricas['resultados'], {'ok': 2, 'fallido': 4, 'invalido': 2, 'rechazado': 1})
+        self.assertIsNotNone(metricas['p99_ms'])
+
+    def test_api_login_backends(self):
+        """
+        Caso de fallo: un login fallido envía user_login_failed, sin la contraseña, en las dos vistas
+        """
+        fallidos = []
+
+        def receptor(sender, credentials, request, **kwargs):
+            fallidos.append(credentials)
+
+        user_login_failed.connect(receptor)
+        self.addCleanup(user_login_failed.disconnect, receptor)
+        for asynchronous in (False, True):
+            response = self._post_login({'email': 'test@mail.com', 'password': 'otra'}, asynchronous)
+            self.assertEquals(response.status_code, 401)
+        self.assertEquals(len(fallidos), 2)
+        self.assertTrue(all(c['email'] == 'test@mail.com' and c['password'] != 'otra' for c in fallidos))
+
+        """
+        Caso de fallo: la autenticación pasa por los AUTHENTICATION_BACKENDS configurados
+        """
+        with self.settings(AUTHENTICATION_BACKENDS=['django.contrib.auth.backends.AllowAllUsersRemoteUserBackend']):
+            for asynchronous in (False, True):
+                response = self._post_login({'email': 'test@mail.com', 'password': 'test1234'}, asynchronous)
+                self.assertEquals(response.status_code, 401)
+        self.assertEquals(len(fallidos), 4)
+
+    def test_api_login_rehash(self):
+        """
+        Caso de exito: al hacer login, un hash con otros parámetros u otro hasher se actualiza a la política actual
+        """
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=1000):
+            self.user.set_password('test1234')
+            self.user.save()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            response = self.client.post(path=self.url_api_login, data={'email': 'test@mail.com', 'password': 'test1234'})
+        self.assertEquals(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+
+        with self.settings(PASSWORD_HASHERS=['authentication.hashers.ScryptPasswordHasher',
+                                             'authentication.hashers.PBKDF2PasswordHasher']):
+            response = self.client.post(path=self.url_api_login, data={'email': 'test@mail.com', 'password': 'test1234'})
+            self.assertEquals(response.status_code, 200)
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith('scrypt$'))
+
+            """
+            Caso de fallo: una contraseña incorrecta no cambia el hash
+            """
+            password = self.user.password
+            response = self.client.post(path=self.url_api_login, data={'email': 'test@mail.com', 'password': 'otra'})
+            self.assertEquals(response.status_code, 401)
+            self.user.refresh_from_db()
+            self.assertEquals(self.user.password, password)
+
+        """
+        Caso de exito: un hash scrypt con un work factor mayor al actual se verifica y se rehashea
+        """
+        with self.settings(PASSWORD_HASHERS=['authentication.hashers.ScryptPasswordHasher'],
+                           PASSWORD_SCRYPT_N=2 ** 15):
+            self.user.set_password('test1234')
+            self.user.save()
+        self.assertTrue(self.user.password.startswith('scrypt$32768$'))
+
+        with self.settings(PASSWORD_HASHERS=['authentication.hashers.ScryptPasswordHasher'],
+                           PASSWORD_SCRYPT_N=2 ** 13):
+            response = self.client.post(path=self.url_api_login, data={'email': 'test@mail.com', 'password': 'test1234'})
+            self.assertEquals(response.status_code, 200)
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith('scrypt$8192$'))
+
+    def test_api_verify_batch(self):
+        """
+        Caso de exito: se verifican varios tokens con una sola consulta a la blacklist
+        """
+        data = dict(self.logged_user.json())
+        response = self.client.post(path=self.url_api_logout, data={'refresh': data['refresh']})
+        self.assertEquals(response.status_code, 200)
+
+        vencido = AccessToken.for_user(self.user)
+        vencido.set_exp(lifetime=-timedelta(minutes=1))
+        tokens = [data['access'], response.json()['refresh'], data['refresh'], 'token-invalido', str(vencido)]
+
+        headers = {'Authorization': f'Bearer {data["access"]}'}
+        with self.assertNumQueries(2):  # el usuario que pide la verificación y la blacklist
+            response = self.client.post(
+                path='/authentication/api/token/verify/batch/',
+                data={'tokens': tokens},
+                content_type='application/json',
+                headers=headers
+            )
+        self.assertEquals(response.status_code, 200)
+        resultados = response.json()['data']
+
+        self.assertEquals([resultado['valid'] for resultado in resultados], [True, True, False, False, False])
+        self.assertEquals([resultado['error'] for resultado in resultados],
+                          [None, None, 'blacklisted', 'invalid', 'expired'])
+        self.assertEquals(resultados[0]['token_type'], 'access')
+        self.assertTrue(resultados[2]['blacklisted'])
+        self.assertIsNotNone(resultados[4]['exp'])
+
+        """
+        Caso de fallo: sin lista de tokens, o con más del máximo
+        """
+        response = self.client.post(path='/authentication/api/token/verify/batch/', data={'tokens': 'abc'},
+                                    content_type='application/json', headers=headers)
+        self.assertEquals(response.status_code, 400)
+        with self.settings(JWT_VERIFY_BATCH_MAX_TOKENS=2):
+            response = self.client.post(path='/authentication/api/token/verify/batch/', data={'tokens': tokens},
+                                        content_type='application/json', headers=headers)
+        self.assertEquals(response.status_code, 400)
+
+        """
+        Caso de fallo: sin autenticación no se verifica ningún token
+        """
+        response = self.client.post(path='/authentication/api/token/verify/batch/', data={'tokens': tokens},
+                                    content_type='application/json')
+        self.assertEquals(response.status_code, 401)
+
+    def test_api_verified_token_cache(self):
+        """
+        Caso de exito: con el cache activo, un token ya verificado no vuelve a verificar la firma
+        """
+        data = dict(self.logged_user.json())
+        headers = {'Authorization': f'Bearer {data["access"]}'}
+
+        with self.settings(JWT_VERIFIED_CACHE_ENABLED=True), \
+                mock.patch('authentication.backends.jwt.decode', wraps=jwt.decode) as decode:
+            for _ in range(3):
+                response = self.client.get(path='/authentication/api/protected/', headers=headers)
+                self.assertEquals(response.status_code, 200)
+            response = self.client.post(path='/authentication/api/token/verify/', data={'token': data['access']})
+            self.assertEquals(response.status_code, 200)
+
+            self.assertEquals(decode.call_count, 1)
+            self.assertEquals(tokens_verificados.stats()['hits'], 3)
+
+            """
+            Caso de exito: el refresh se rota sin alterar los claims guardados
+            """
+            response = self.client.post(path=self.url_api_logout, data={'refresh': data['refresh']})
+            self.assertEquals(response.status_code, 200)
+
+            """
+            Caso de fallo: el refresh rotado se rechaza aunque sus claims estén en el cache
+            """
+            response = self.client.post(path=self.url_api_logout, data={'refresh': data['refresh']})
+            self.assertEquals(response.status_code, 401)
+            response = self.client.post(path='/authentication/api/token/verify/', data={'token': 'token-invalido'})
+            self.assertEquals(response.status_code, 401)
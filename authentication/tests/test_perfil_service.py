@@ -2,6 +2,7 @@ import datetime
 from django.test import TestCase
 from ..services.PerfilService import PerfilService
 from ..models import Usuario, Perfil
+from ..cache import UsuarioCache
 
 
 class TestPerfilService(TestCase):
@@ -31,6 +32,7 @@ class TestPerfilService(TestCase):
         }
 
         self.service = PerfilService()
+        UsuarioCache().clear()
 
     def crear_usuario(self):
         # crea un usuario
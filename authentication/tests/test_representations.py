@@ -0,0 +1,43 @@
+import datetime
+import itertools
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from ..models import Usuario, Perfil
+from ..representations import UsuarioRepresentation
+from ..serializers import UsuarioSerializer
+
+
+class TestUsuarioRepresentation(TestCase):
+    def setUp(self):
+        con_perfil = Usuario.objects.create(username='conperfil', email='con@email.com')
+        Perfil.objects.create(
+            usuario=con_perfil,
+            nombre='Test',
+            apellido='Tester',
+            fecha_nacimiento=datetime.date(2000, 1, 31)
+        )
+        perfil_vacio = Usuario.objects.create(username='perfilvacio', email='vacio@email.com')
+        Perfil.objects.create(usuario=perfil_vacio)
+        Usuario.objects.create(username='sinperfil', email='sin@email.com')
+
+    def test_misma_salida_que_el_serializer(self):
+        """
+        Caso de éxito: para cada combinación de campos, el JSON generado es idéntico byte a byte al del serializer
+        """
+        renderer = JSONRenderer()
+        campos = UsuarioSerializer.REPRESENTATION_FIELDS
+        combinaciones = [None] + [
+            set(combinacion)
+            for largo in range(1, len(campos) + 1)
+            for combinacion in itertools.combinations(campos, largo)
+        ]
+
+        for fields in combinaciones:
+            usuarios = Usuario.objects.select_related('perfil').order_by('id')
+            esperado = renderer.render(UsuarioSerializer(usuarios, many=True, fields=fields).data)
+
+            representation = UsuarioRepresentation.for_fields(fields)
+            filas = representation.values(Usuario.objects.order_by('id'))
+            obtenido = renderer.render(representation.to_list(filas))
+
+            self.assertEqual(obtenido, esperado, f'fields={fields}')
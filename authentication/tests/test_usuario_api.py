@@ -1,11 +1,19 @@
-from django.test import TestCase, Client
+import json
+import time
+from asgiref.sync import async_to_sync
+from django.test import TestCase, Client, AsyncRequestFactory
+from django.urls import resolve
+from django.utils.http import http_date
 from ..models import Usuario, Perfil
 from ..serializers import UsuarioSerializer
+from ..cache import UsuarioCache
+from ..services.UsuarioService import UsuarioService
 
 
 class TestUsuarioAPI(TestCase):
     def setUp(self):
         self.client = Client()
+        UsuarioCache().clear()
         self.url_api_usuario = '/usuario/api/'
         self.url_api_login = '/authentication/api/token/'
         self.model_usuario = Usuario
@@ -168,6 +176,157 @@ class TestUsuarioAPI(TestCase):
         )
         self.assertEquals(response.status_code, 200)
 
+    def test_api_export_users(self):
+        """
+        Caso de exito: un usuario staff exporta los usuarios en ndjson y en csv
+        """
+        admin = self.model_usuario.objects.create_user(
+            username='admin',
+            password='admin1234',
+            email='admin@mail.com'
+        )
+        admin.is_staff = True
+        admin.save()
+        token = self._autenticar_usuario({'email': admin.email, 'password': 'admin1234'})
+        headers = {'Authorization': f'Bearer {token}'}
+
+        response = self.client.get(
+            path=f'{self.url_api_usuario}export/',
+            headers=headers
+        )
+        self.assertEquals(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lineas = [json.loads(linea) for linea in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEquals(len(lineas), 2)
+        self.assertEquals(lineas[0]['perfil']['nombre'], 'Tester')
+        self.assertNotIn('perfil', lineas[1])
+
+        response = self.client.get(
+            path=f'{self.url_api_usuario}export/?formato=csv',
+            headers=headers
+        )
+        self.assertEquals(response.status_code, 200)
+        lineas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEquals(lineas[0], 'id,username,email,nombre,apellido,fecha_nacimiento')
+        self.assertEquals(len(lineas), 3)
+
+        """
+        Caso de fallo: formato invalido
+        """
+        response = self.client.get(
+            path=f'{self.url_api_usuario}export/?formato=xml',
+            headers=headers
+        )
+        self.assertEquals(response.status_code, 400)
+
+        """
+        Caso de fallo: usuario sin permisos de staff
+        """
+        token = self._autenticar_usuario({'email': 'test@mail.com', 'password': 'test1234'})
+        response = self.client.get(
+            path=f'{self.url_api_usuario}export/',
+            headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertEquals(response.status_code, 403)
+
+    def test_api_export_users_asgi(self):
+        """
+        Caso de exito: bajo ASGI la exportacion se genera con un iterador asincrono
+        """
+        admin = self.model_usuario.objects.create_user(username='admin', password='admin1234',
+                                                       email='admin@mail.com')
+        admin.is_staff = True
+        admin.save()
+        token = self._autenticar_usuario({'email': admin.email, 'password': 'admin1234'})
+        request = AsyncRequestFactory().get(f'{self.url_api_usuario}export/?formato=csv',
+                                            headers={'Authorization': f'Bearer {token}'})
+
+        response = resolve(request.path).func(request)
+        self.assertEquals(response.status_code, 200)
+        self.assertTrue(response.is_async)
+
+        async def leer():
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        lineas = async_to_sync(leer)().decode().splitlines()
+        self.assertEquals(lineas[0], 'id,username,email,nombre,apellido,fecha_nacimiento')
+        self.assertEquals(len(lineas), 3)
+
+    def test_api_batch_users(self):
+        """
+        Caso de exito: se consultan varios usuarios por id, con una unica consulta
+        """
+        otro = self.model_usuario.objects.create(username='otro', email='otro@mail.com')
+        token = self._autenticar_usuario({'email': 'test@mail.com', 'password': 'test1234'})
+        headers = {'Authorization': f'Bearer {token}'}
+
+        with self.assertNumQueries(2):  # autenticacion + consulta de usuarios
+            response = self.client.post(
+                path=f'{self.url_api_usuario}batch/',
+                headers=headers,
+                data={'ids': [self.user.id, otro.id, 999]},
+                content_type='application/json'
+            )
+        self.assertEquals(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEquals(data['usuarios'][str(otro.id)], {'id': otro.id, 'username': 'otro', 'email': 'otro@mail.com'})
+        self.assertEquals(data['usuarios'][str(self.user.id)]['perfil']['nombre'], 'Tester')
+        self.assertEquals(data['faltantes'], [999])
+
+        """
+        Caso de Fallo: se supera la cantidad maxima de ids
+        """
+        with self.settings(USUARIO_BATCH_MAX_IDS=1):
+            response = self.client.post(
+                path=f'{self.url_api_usuario}batch/',
+                headers=headers,
+                data={'ids': [self.user.id, otro.id]},
+                content_type='application/json'
+            )
+        self.assertEquals(response.status_code, 400)
+
+        """
+        Caso de Fallo: sin token de autorizacion
+        """
+        response = self.client.post(
+            path=f'{self.url_api_usuario}batch/',
+            data={'ids': [self.user.id]},
+            content_type='application/json'
+        )
+        self.assertEquals(response.status_code, 401)
+
+    def test_api_search_users(self):
+        """
+        Caso de exito: se buscan usuarios por prefijo de username o email, sin distinguir mayusculas
+        """
+        leo = self.model_usuario.objects.create(username='leo.messi', email='lionel@mail.com')
+        leandro = self.model_usuario.objects.create(username='Leandro', email='paredes@mail.com')
+        self.model_usuario.objects.create(username='suarez', email='leo_suarez@mail.com', is_active=False)
+        self.model_usuario.objects.create(username='dibu', email='martinez@mail.com')
+
+        response = self.client.get(path=f'{self.url_api_usuario}search/?q=LE')
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals([usuario['id'] for usuario in response.json()['data']], [leo.id, leandro.id])
+
+        response = self.client.get(path=f'{self.url_api_usuario}search/?q=le&page_size=1')
+        self.assertEquals(len(response.json()['data']), 1)
+        self.assertIsNotNone(response.json()['links']['next'])
+
+        response = self.client.get(path=f'{self.url_api_usuario}search/?q=lio&fields=username')
+        self.assertEquals(response.json()['data'], [{'username': 'leo.messi'}])
+
+        # los cambios de username se reflejan en la busqueda
+        leandro.username = 'paredes'
+        leandro.save()
+        response = self.client.get(path=f'{self.url_api_usuario}search/?q=pare')
+        self.assertEquals([usuario['id'] for usuario in response.json()['data']], [leandro.id])
+
+        """
+        Caso de Fallo: texto de busqueda muy corto
+        """
+        response = self.client.get(path=f'{self.url_api_usuario}search/?q=l')
+        self.assertEquals(response.status_code, 400)
+
     def test_api_get_one_user(self):
         """
         Caso de exito: Se crea un usuario, inicia sesion, y se realiza la peticion para listar el usuario
@@ -206,6 +365,66 @@ class TestUsuarioAPI(TestCase):
         )
         self.assertEquals(response.status_code, 401)
 
+    def test_api_conditional_get(self):
+        """
+        Caso de exito: retrieve responde ETag y Last-Modified, y 304 si el usuario no cambio
+        """
+        token = self._autenticar_usuario({'email': 'test@mail.com', 'password': 'test1234'})
+        headers = {'Authorization': f'Bearer {token}'}
+        path = f'{self.url_api_usuario}{self.user.id}/'
+
+        response = self.client.get(path=path, headers=headers)
+        self.assertEquals(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(2):  # autenticacion + version del usuario
+            response = self.client.get(path=path, headers={**headers, 'If-None-Match': etag})
+        self.assertEquals(response.status_code, 304)
+        self.assertEquals(response['ETag'], etag)
+
+        response = self.client.get(path=path, headers={**headers, 'If-Modified-Since': response['Last-Modified']})
+        self.assertEquals(response.status_code, 304)
+
+        # otra seleccion de campos es otra representacion
+        response = self.client.get(path=f'{path}?fields=id', headers={**headers, 'If-None-Match': etag})
+        self.assertEquals(response.status_code, 200)
+
+        """
+        Caso de exito: al modificar el perfil cambia el ETag
+        """
+        self.perfil_user.nombre = 'Otro'
+        self.perfil_user.save()
+        response = self.client.get(path=path, headers={**headers, 'If-None-Match': etag})
+        self.assertEquals(response.status_code, 200)
+        self.assertNotEquals(response['ETag'], etag)
+
+        """
+        Caso de exito: list responde 304 si la pagina no cambio
+        """
+        response = self.client.get(path=self.url_api_usuario)
+        etag = response['ETag']
+        response = self.client.get(path=self.url_api_usuario, headers={'If-None-Match': etag})
+        self.assertEquals(response.status_code, 304)
+
+        self.model_usuario.objects.create(username='nuevo', email='nuevo@mail.com')
+        response = self.client.get(path=self.url_api_usuario, headers={'If-None-Match': etag})
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(len(response.json()['data']), 2)
+
+        """
+        Caso de exito: list no responde Last-Modified, un usuario que sale de la pagina cambia el ETag
+        """
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        nuevo = self._get_usuario_by_username('nuevo')
+        UsuarioService().delete_user(nuevo.id)
+        response = self.client.get(path=self.url_api_usuario, headers={
+            'If-None-Match': etag, 'If-Modified-Since': http_date(time.time())
+        })
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(len(response.json()['data']), 1)
+
     def test_api_update_username(self):
         """
         Caso de exito: Se crea un usuario en bd, se inicia sesion, se realiza la peticion modificando el username por uno valido
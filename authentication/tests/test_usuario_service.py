@@ -1,6 +1,11 @@
+from django.db import connection
+from django.utils import timezone
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from ..services.UsuarioService import UsuarioService
-from ..models import Usuario
+from ..services.PerfilService import PerfilService
+from ..models import Usuario, Perfil
+from ..cache import UsuarioCache
 
 
 class TestUsuarioService(TestCase):
@@ -13,6 +18,7 @@ class TestUsuarioService(TestCase):
         }
 
         self.service = UsuarioService()
+        UsuarioCache().clear()
 
     def crear_usuario(self):
         # crea un usuario
@@ -91,6 +97,113 @@ class TestUsuarioService(TestCase):
         self.assertEqual(len(data), 1)  # Verificar que la lista tenga un elemento
         self.assertEqual(data[0]['username'], 'test10')  # Verificar el contenido del usuario
 
+    def test_list_all_users_paginado(self):
+        """
+        Caso de éxito: recorrer el listado en páginas usando los cursores de 'next' y 'prev'
+        """
+        ids = [
+            Usuario.objects.create(username=f'user{i}', email=f'user{i}@email.com').id
+            for i in range(5)
+        ]
+
+        response = self.service.list_all_users(page_size=2)
+        links = response.data['links']
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([u['id'] for u in response.data['data']], ids[:2])
+        self.assertIsNone(links['prev'])
+
+        cursor = links['next'].split('cursor=')[1]
+        response = self.service.list_all_users(cursor=cursor, page_size=2)
+        links = response.data['links']
+        self.assertEqual([u['id'] for u in response.data['data']], ids[2:4])
+
+        cursor = links['next'].split('cursor=')[1]
+        response = self.service.list_all_users(cursor=cursor, page_size=2)
+        self.assertEqual([u['id'] for u in response.data['data']], ids[4:])
+        self.assertIsNone(response.data['links']['next'])
+
+        cursor = response.data['links']['prev'].split('cursor=')[1]
+        response = self.service.list_all_users(cursor=cursor, page_size=2)
+        self.assertEqual([u['id'] for u in response.data['data']], ids[2:4])
+
+        """
+        Caso de fallo: cursor inválido
+        """
+        response = self.service.list_all_users(cursor='cursor_invalido')
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_all_users_cantidad_de_queries(self):
+        """
+        Caso de éxito: el listado usa una única consulta sin importar la cantidad de usuarios o perfiles
+        """
+        def crear_usuarios(desde, hasta):
+            for i in range(desde, hasta):
+                user = Usuario.objects.create(username=f'user{i}', email=f'user{i}@email.com')
+                if i % 2 == 0:
+                    Perfil.objects.create(usuario=user, nombre='Test', apellido='Tester')
+
+        crear_usuarios(0, 2)
+        with self.assertNumQueries(1):
+            response = self.service.list_all_users()
+        self.assertEqual(len(response.data['data']), 2)
+
+        crear_usuarios(2, 10)
+        with self.assertNumQueries(1):
+            response = self.service.list_all_users()
+        data = response.data['data']
+        self.assertEqual(len(data), 10)
+        self.assertIn('perfil', data[0])
+        self.assertNotIn('perfil', data[1])
+
+        """
+        Caso de éxito: obtener un usuario con su perfil en una única consulta
+        """
+        with self.assertNumQueries(1):
+            response = self.service.list_one_user(data[0]['id'])
+        self.assertEqual(response.data['data']['perfil']['nombre'], 'Test')
+
+    def test_list_users_fields(self):
+        """
+        Caso de éxito: con 'fields' solo se consultan y serializan los campos pedidos, sin join con perfil
+        """
+        user = self.crear_usuario()
+        Perfil.objects.create(usuario=user, nombre='Test', apellido='Tester')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.service.list_all_users(fields='id,username')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data'], [{'id': user.id, 'username': 'test10'}])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('perfil', queries[0]['sql'])
+        self.assertNotIn('email', queries[0]['sql'])
+
+        response = self.service.list_all_users(fields='username,perfil')
+        self.assertEqual(response.data['data'][0]['perfil']['nombre'], 'Test')
+        self.assertNotIn('email', response.data['data'][0])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.service.list_one_user(user.id, fields='email')
+        self.assertEqual(response.data['data'], {'email': 'test@email.com'})
+        self.assertNotIn('perfil', queries[0]['sql'])
+
+        """
+        Caso de éxito: 'fields' sin ningún campo es la representación completa, con o sin cache
+        """
+        completo = self.service.list_one_user(user.id).data['data']
+        for _ in range(2):
+            response = self.service.list_one_user(user.id, fields=',')
+            self.assertEqual(response.data['data'], completo)
+        self.assertEqual(self.service.list_all_users(fields=' , ').data['data'][0], completo)
+
+        """
+        Caso de fallo: campo inexistente
+        """
+        response = self.service.list_all_users(fields='id,password')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.service.list_one_user(user.id, fields='password')
+        self.assertEqual(response.status_code, 400)
+
     def test_list_one_user(self):
         """
         Caso de fallo: no hay usuarios en base de datos
@@ -139,6 +252,61 @@ class TestUsuarioService(TestCase):
         data = response.data.get('data', response.data.get('detail'))
         self.assertEqual(status, 500)
 
+    def test_list_one_user_cache(self):
+        """
+        Caso de éxito: la segunda lectura de un usuario se resuelve desde el cache, sin consultas
+        """
+        user = self.crear_usuario()
+        response = self.service.list_one_user(user.id)
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = self.service.list_one_user(user.id)
+        self.assertEqual(response.data['data']['username'], 'test10')
+        self.assertEqual(UsuarioCache.stats()['hits'], 1)
+        self.assertEqual(UsuarioCache.stats()['misses'], 1)
+
+        """
+        Caso de éxito: actualizar el username invalida el cache
+        """
+        self.service.update_username_user(id=user.id, username='nuevo_username')
+        response = self.service.list_one_user(user.id)
+        self.assertEqual(response.data['data']['username'], 'nuevo_username')
+
+        """
+        Caso de éxito: una escritura de otro proceso (que no invalida este cache) cambia la versión,
+        y la entrada guardada con la versión anterior no se usa
+        """
+        self.service.get_user_version(user.id)
+        self.service.list_one_user(user.id)
+        Usuario.objects.filter(id=user.id).update(username='otro_proceso', updated_at=timezone.now())
+
+        service = UsuarioService()
+        service.get_user_version(user.id)
+        response = service.list_one_user(user.id)
+        self.assertEqual(response.data['data']['username'], 'otro_proceso')
+
+        """
+        Caso de éxito: agregar un perfil invalida el cache
+        """
+        PerfilService().add_perfil_to_user(id=user.id, nombre='Test', apellido='Tester', fecha_nacimiento='2000-01-01')
+        response = self.service.list_one_user(user.id)
+        self.assertEqual(response.data['data']['perfil']['nombre'], 'Test')
+
+        """
+        Caso de éxito: eliminar el usuario invalida el cache
+        """
+        self.service.delete_user(user.id)
+        response = self.service.list_one_user(user.id)
+        self.assertEqual(response.status_code, 404)
+
+        """
+        Caso de éxito: con el cache desactivado siempre se consulta la base de datos
+        """
+        with self.settings(USUARIO_CACHE_ENABLED=False):
+            with self.assertNumQueries(1):
+                self.service.list_one_user(user.id)
+
     def test_create_user(self):
         """
         Caso de éxito: crear un usuario con datos válidos
@@ -301,6 +469,50 @@ class TestUsuarioService(TestCase):
         self.assertIn('email', data)
         self.assertIn('password', data)
 
+    def test_bulk_create_users(self):
+        """
+        Caso de éxito: se crean los usuarios válidos y se reportan los errores por índice
+        """
+        self.crear_usuario()
+        usuarios = [
+            {'username': 'bulk1', 'email': 'bulk1@email.com', 'password': 'bulk12345'},
+            {'username': 'in', 'email': 'mailinvalido.com', 'password': 'x'},
+            {'username': 'bulk2', 'email': 'bulk2@email.com', 'password': 'bulk12345'},
+            {'username': 'bulk1', 'email': 'otro@email.com', 'password': 'bulk12345'},
+            {'username': 'test10', 'email': 'nuevo@email.com', 'password': 'bulk12345'},
+        ]
+
+        # fuerza el uso del pool de procesos
+        with self.settings(USUARIO_BULK_HASH_MIN_PARALLEL=1):
+            response = self.service.bulk_create_users(usuarios)
+
+        self.assertEqual(response.status_code, 201)
+        data = response.data['data']
+        self.assertEqual(data['creados'], 2)
+        self.assertEqual([error['index'] for error in data['errores']], [1, 3, 4])
+
+        usuario = Usuario.objects.get(username='bulk2')
+        self.assertTrue(usuario.check_password('bulk12345'))
+
+        """
+        Caso de fallo: ningún usuario válido
+        """
+        response = self.service.bulk_create_users([usuarios[1]])
+        self.assertEqual(response.status_code, 400)
+
+        """
+        Caso de fallo: el lote supera el máximo permitido
+        """
+        with self.settings(USUARIO_BULK_MAX_SIZE=1):
+            response = self.service.bulk_create_users(usuarios)
+        self.assertEqual(response.status_code, 400)
+
+        """
+        Caso de fallo: no se envía una lista
+        """
+        response = self.service.bulk_create_users({'username': 'bulk3'})
+        self.assertEqual(response.status_code, 400)
+
     def test_set_password_user(self):
         """
         Caso de fallo: set password a un usuario que no existe en base de datos
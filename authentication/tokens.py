@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .blacklist import is_blacklisted
+from .claims import PERMISOS_CLAIM, add_permission_claims, permisos_from_claim
+from .models import Usuario
+
+
+class UsuarioRefreshToken(RefreshToken):
+    """
+    RefreshToken que consulta la blacklist a través del filtro en memoria (authentication.blacklist).
+    Con JWT_PERMISSION_CLAIMS, al renovar el token se vuelven a cargar los permisos del usuario.
+    """
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    @property
+    def access_token(self):
+        if settings.JWT_PERMISSION_CLAIMS:
+            user = Usuario.objects.filter(
+                **{api_settings.USER_ID_FIELD: self.payload[api_settings.USER_ID_CLAIM]}
+            ).first()
+            if user is not None:
+                # el refresh rotado también lleva los permisos nuevos
+                add_permission_claims(self, user)
+        return super().access_token
+
+
+class UsuarioTokenUser(TokenUser):
+    """
+    TokenUser (autenticación sin estado) que resuelve los permisos con los claims del token.
+    """
+
+    @cached_property
+    def _permisos(self):
+        claim = self.token.get(PERMISOS_CLAIM)
+        return permisos_from_claim(claim) if claim else frozenset()
+
+    def get_all_permissions(self, obj=None):
+        return set(self._permisos)
+
+    def has_perm(self, perm, obj=None):
+        return self.is_active and (self.is_superuser or perm in self._permisos)
+
+    def has_perms(self, perm_list, obj=None):
+        return all(self.has_perm(perm, obj) for perm in perm_list)
+
+    def has_module_perms(self, module):
+        return self.is_active and (
+            self.is_superuser or any(perm.startswith(f'{module}.') for perm in self._permisos)
+        )
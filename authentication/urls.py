@@ -14,14 +14,20 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.urls import path, include
-from rest_framework_simplejwt.views import TokenVerifyView, TokenRefreshView
-from .views import CustomTokenObtainPairView, ProtectedView
+from .views import CustomTokenObtainPairView, AsyncTokenObtainPairView, CustomTokenRefreshView, \
+    CustomTokenVerifyView, ProtectedView, LoginMetricsView, JWKSView, TokenVerifyBatchView
 
+# bajo ASGI el login es asíncrono (djangoProject/asgi.py activa LOGIN_ASYNC)
+TokenObtainView = AsyncTokenObtainPairView if settings.LOGIN_ASYNC else CustomTokenObtainPairView
 
 urlpatterns = [
-     path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+     path('token/', TokenObtainView.as_view(), name='token_obtain_pair'),
+     path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
+     path('token/metrics/', LoginMetricsView.as_view(), name='token_metrics'),
      path('protected/', ProtectedView.as_view(), name='protected'),
-     path('token/verify/', TokenVerifyView.as_view(), name='verificar_token'),
+     path('.well-known/jwks.json', JWKSView.as_view(), name='jwks'),
+     path('token/verify/', CustomTokenVerifyView.as_view(), name='verificar_token'),
+     path('token/verify/batch/', TokenVerifyBatchView.as_view(), name='verificar_tokens'),
 ]
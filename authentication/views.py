@@ -1,13 +1,33 @@
+import json
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import aauthenticate
+from django.contrib.auth.models import update_last_login
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
 from rest_framework.generics import GenericAPIView
 from rest_framework.viewsets import GenericViewSet
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status as st, status
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
 from drf_yasg.utils import swagger_auto_schema
 from .mixins import LoginAndIsOwnerMixin, AllowAny, IsAuthenticated
 from .services.UsuarioService import UsuarioService
 from .services.PerfilService import PerfilService
+from .services.TokenService import TokenService
+from .conditional import conditional_response
+from .keyring import get_keyring
+from .backends import tokens_verificados
+from .hashing import get_check_password_pool, HashPoolSaturado
+from .metrics import LatencyMetrics
 from .serializers import *
 
 
@@ -18,21 +38,80 @@ class UsuarioViewSet(GenericViewSet, LoginAndIsOwnerMixin):
 
     def get_permissions(self):
         # Aplicar el mixin a todas las vistas excepto las de la lista
-        if self.action in ['list', 'create']:
+        if self.action in ['list', 'create', 'search']:
             return [AllowAny()]
 
+        if self.action in ['export', 'bulk_create']:
+            return [IsAdminUser()]
+
+        if self.action in ['batch']:
+            return [IsAuthenticated()]
+
         return [LoginAndIsOwnerMixin()]
 
     @swagger_auto_schema(responses={200: UsuarioSerializer()})
     def list(self, request):
         """
-        Retorna un listado de todos los usuarios
+        Retorna un listado paginado de los usuarios
 
 
-        :param request:
-        :return: Lista vacía o Lista con todos los usuarios
+        :param request: cursor(opcional), page_size(opcional), fields(opcional, ej. id,username)
+        :return: Lista vacía o página de usuarios, con los links 'next' y 'prev'
+        """
+        service = UsuarioService()
+        cursor = request.query_params.get('cursor', None)
+        page_size = request.query_params.get('page_size', None)
+        fields = request.query_params.get('fields', None)
+
+        base_url = request.build_absolute_uri()
+
+        def get_response():
+            return service.list_all_users(
+                cursor=cursor,
+                page_size=page_size,
+                base_url=base_url,
+                fields=fields
+            )
+
+        version = service.get_users_version(cursor=cursor, page_size=page_size, base_url=base_url, fields=fields)
+        if version is None:
+            return get_response()
+
+        etag, last_modified = version
+        return conditional_response(request, etag, last_modified, get_response)
+
+    @swagger_auto_schema(responses={200: UsuarioSerializer()})
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request):
+        """
+        Busca usuarios por prefijo de username o email
+
+
+        :param request: q, cursor(opcional), page_size(opcional), fields(opcional, ej. id,username)
+        :return: Lista vacía o página de usuarios encontrados, con los links 'next' y 'prev'
         """
-        response = UsuarioService().list_all_users()
+        response = UsuarioService().search_users(
+            q=request.query_params.get('q', None),
+            cursor=request.query_params.get('cursor', None),
+            page_size=request.query_params.get('page_size', None),
+            base_url=request.build_absolute_uri(),
+            fields=request.query_params.get('fields', None)
+        )
+        return response
+
+    @swagger_auto_schema(responses={200: 'ndjson o csv'})
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        Exporta todos los usuarios con sus datos de perfil, en streaming
+
+
+        :param request: formato(opcional): ndjson (por defecto) o csv
+        :return: Archivo ndjson o csv, o error: formato inválido
+        """
+        formato = request.query_params.get('formato', 'ndjson')
+        # bajo ASGI el cuerpo tiene que ser un iterador asíncrono para no cargarse entero en memoria
+        response = UsuarioService().export_users(formato, asynchronous=isinstance(request._request, ASGIRequest))
         return response
 
     @swagger_auto_schema(responses={200: UsuarioSerializer()})
@@ -41,12 +120,37 @@ class UsuarioViewSet(GenericViewSet, LoginAndIsOwnerMixin):
         Retorna un usuario
 
 
-        :param request:
+        :param request: fields(opcional, ej. id,username)
         :param pk: int
         :return: El usuario (id, username, password, email, first_name, last_name) o error: usuario no encontrado
         """
         service = UsuarioService()
-        response = service.list_one_user(pk)
+        fields = request.query_params.get('fields', None)
+
+        def get_response():
+            return service.list_one_user(pk, fields=fields)
+
+        version = service.get_user_version(pk, fields=fields)
+        if version is None:
+            return get_response()
+
+        etag, last_modified = version
+        return conditional_response(request, etag, last_modified, get_response)
+
+    @swagger_auto_schema(request_body=BatchUsuarioSerializer, responses={200: 'usuarios, faltantes'})
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch(self, request):
+        """
+        Retorna varios usuarios a partir de una lista de ids
+
+
+        :param request: ids, fields(opcional, ej. id,username)
+        :return: usuarios por id y ids no encontrados, o error: datos inválidos
+        """
+        ids = request.data.get('ids', None)
+        fields = request.data.get('fields', None)
+
+        response = UsuarioService().list_users_by_ids(ids, fields=fields)
         return response
 
     @swagger_auto_schema(request_body=UsuarioSerializer, responses={200: UsuarioSerializer, 400: UsuarioSerializer()})
@@ -68,6 +172,19 @@ class UsuarioViewSet(GenericViewSet, LoginAndIsOwnerMixin):
         )
         return response
 
+    @swagger_auto_schema(request_body=UsuarioSerializer(many=True), responses={201: 'creados, errores', 400: 'errores'})
+    @action(detail=False, methods=['post'], url_path='bulk_create')
+    def bulk_create(self, request):
+        """
+        Crea usuarios en lote
+
+
+        :param request: lista de usuarios (username, password, email)
+        :return: cantidad de usuarios creados y errores por índice, o error: datos inválidos
+        """
+        response = UsuarioService().bulk_create_users(request.data)
+        return response
+
     @swagger_auto_schema(request_body=PerfilSerializer, responses={200: PerfilSerializer(), 400: PerfilSerializer()})
     @action(detail=True, methods=['post'], url_path='add_perfil')
     def add_perfil_to_user(self, request, pk=None):
@@ -201,8 +318,159 @@ class UsuarioViewSet(GenericViewSet, LoginAndIsOwnerMixin):
         return response
 
 
+login_metrics = LatencyMetrics(window=settings.LOGIN_METRICS_WINDOW)
+
+
 class CustomTokenObtainPairView(TokenObtainPairView):
+    """
+    Login sincrónico (WSGI): la vista de simplejwt, que autentica con authenticate() y los AUTHENTICATION_BACKENDS.
+    Registra la latencia y el resultado en las métricas de login.
+    """
+    serializer_class = CustomTokenObtainPairSerializer
+
+    def post(self, request, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            response = super().post(request, *args, **kwargs)
+        except AuthenticationFailed:
+            login_metrics.record('fallido', time.perf_counter() - inicio)
+            raise
+        except ValidationError:
+            login_metrics.record('invalido')
+            raise
+
+        login_metrics.record('ok', time.perf_counter() - inicio)
+        return response
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncTokenObtainPairView(View):
+    """
+    Login asíncrono (ASGI): autentica con aauthenticate(), así se usan los AUTHENTICATION_BACKENDS y un login
+    fallido envía user_login_failed. Con UsuarioModelBackend la contraseña se verifica en un pool acotado de
+    threads (authentication.hashing.CheckPasswordPool) y el worker sigue atendiendo otros requests durante el hash.
+    Con el pool saturado responde 503 enseguida, sin encolar más trabajo.
+    """
     serializer_class = CustomTokenObtainPairSerializer
+    http_method_names = ['post']
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # drf_yasg solo documenta vistas de DRF: el endpoint se documenta con la vista sincrónica equivalente
+        view.cls, view.initkwargs = CustomTokenObtainPairView, {}
+        return view
+
+    @staticmethod
+    def _get_data(request):
+        if request.content_type == 'application/json':
+            try:
+                return json.loads(request.body or b'{}')
+            except ValueError:
+                raise ValidationError({'detail': 'JSON inválido'})
+        return request.POST
+
+    def _get_tokens(self, user):
+        refresh = self.serializer_class.get_token(user)
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
+        return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+    async def _login(self, request):
+        serializer = self.serializer_class()
+        # solo la validación de los campos, la autenticación la hacen los backends
+        data = serializer.to_internal_value(self._get_data(request))
+
+        username_field = serializer.username_field
+        user = await aauthenticate(request, **{username_field: data[username_field], 'password': data['password']})
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            return None
+
+        return await sync_to_async(self._get_tokens)(user)
+
+    async def post(self, request):
+        inicio = time.perf_counter()
+        try:
+            tokens = await self._login(request)
+        except ValidationError as e:
+            login_metrics.record('invalido')
+            return JsonResponse(e.detail, status=status.HTTP_400_BAD_REQUEST)
+        except HashPoolSaturado:
+            login_metrics.record('rechazado')
+            response = JsonResponse({'detail': 'Servicio saturado, reintente en unos segundos'},
+                                    status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = str(settings.LOGIN_RETRY_AFTER)
+            return response
+
+        latencia = time.perf_counter() - inicio
+        if tokens is None:
+            login_metrics.record('fallido', latencia)
+            return JsonResponse({'detail': CustomTokenObtainPairSerializer.default_error_messages['no_active_account']},
+                                status=status.HTTP_401_UNAUTHORIZED)
+
+        login_metrics.record('ok', latencia)
+        return JsonResponse(tokens)
+
+
+class TokenVerifyBatchView(GenericAPIView):
+    # solo con un token válido: cada request puede pedir hasta JWT_VERIFY_BATCH_MAX_TOKENS verificaciones de firma
+    permission_classes = [IsAuthenticated]
+    serializer_class = BatchTokenVerifySerializer
+
+    @swagger_auto_schema(request_body=BatchTokenVerifySerializer, responses={200: 'un resultado por token'})
+    def post(self, request):
+        """
+        Verifica varios tokens en un solo request
+
+
+        :param request: tokens
+        :return: por cada token, en el mismo orden: valid, error (expired, invalid, blacklisted), token_type,
+            exp y blacklisted. O error: datos inválidos
+        """
+        response = TokenService().verify_tokens(request.data.get('tokens', None))
+        return response
+
+
+class JWKSView(View):
+    """
+    Claves públicas para verificar los tokens (JWKS), así los otros servicios los validan localmente
+    sin llamar a token/verify/. La respuesta se precalcula al cargar el key ring (al iniciar, si existen las claves)
+    y se sirve con ETag y Cache-Control.
+    """
+    http_method_names = ['get', 'head']
+
+    def get(self, request):
+        body, etag = get_keyring().jwks()
+        response = conditional_response(
+            request, etag, None, lambda: HttpResponse(body, content_type='application/json')
+        )
+        response['Cache-Control'] = f'public, max-age={settings.JWT_JWKS_MAX_AGE}'
+        return response
+
+
+class LoginMetricsView(GenericAPIView):
+    permission_classes = [IsAdminUser]
+    serializer_class = None
+
+    def get(self, request):
+        """
+        Latencias p50/p99 de los logins recientes de este proceso, resultados, estado del pool de hash
+        y del cache de tokens verificados.
+        """
+        pool = get_check_password_pool()
+        return Response({
+            **login_metrics.stats(),
+            'pool': {'workers': pool.workers, 'pending': pool.pending, 'max_pending': pool.max_pending},
+            'tokens_verificados': tokens_verificados.stats(),
+        })
+
+
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+
+
+class CustomTokenVerifyView(TokenVerifyView):
+    serializer_class = CustomTokenVerifySerializer
 
 
 class ProtectedView(GenericAPIView):
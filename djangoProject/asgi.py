@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangoProject.settings')
+# bajo ASGI el gateway usa la vista asíncrona (gateway.views.AsyncGastosServiceView)
+os.environ.setdefault('GATEWAY_ASYNC', 'True')
+# y el login asíncrono (authentication.views.AsyncTokenObtainPairView)
+os.environ.setdefault('LOGIN_ASYNC', 'True')
 
 application = get_asgi_application()
@@ -0,0 +1,26 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cache de la representación de usuarios. En producción con varios procesos conviene un backend
+# compartido (por ej. django.core.cache.backends.redis.RedisCache) para que la invalidación alcance a todos.
+USUARIO_CACHE_ENABLED = os.getenv('USUARIO_CACHE_ENABLED', 'True') == 'True'
+USUARIO_CACHE_ALIAS = 'usuarios'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    USUARIO_CACHE_ALIAS: {
+        'BACKEND': os.getenv('USUARIO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('USUARIO_CACHE_LOCATION', 'usuarios'),
+        # segundos que vive cada entrada
+        'TIMEOUT': int(os.getenv('USUARIO_CACHE_TTL', 300)),
+        'OPTIONS': {
+            # al superar MAX_ENTRIES se descartan las entradas menos usadas recientemente (LRU)
+            'MAX_ENTRIES': int(os.getenv('USUARIO_CACHE_MAX_ENTRIES', 10000)),
+            'CULL_FREQUENCY': 10,
+        },
+    },
+}
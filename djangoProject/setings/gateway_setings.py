@@ -0,0 +1,31 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Pool de conexiones del gateway hacia los servicios: conexiones keep-alive que se reutilizan por proceso
+GATEWAY_POOL_CONNECTIONS = int(os.getenv('GATEWAY_POOL_CONNECTIONS', 10))
+# conexiones abiertas por host; por encima se abren conexiones que no vuelven al pool
+GATEWAY_POOL_MAXSIZE = int(os.getenv('GATEWAY_POOL_MAXSIZE', 50))
+# False cierra la conexión después de cada request (Connection: close)
+GATEWAY_KEEP_ALIVE = os.getenv('GATEWAY_KEEP_ALIVE', 'True') == 'True'
+# segundos para conectar y para esperar la respuesta del servicio
+GATEWAY_CONNECT_TIMEOUT = float(os.getenv('GATEWAY_CONNECT_TIMEOUT', 5))
+GATEWAY_READ_TIMEOUT = float(os.getenv('GATEWAY_READ_TIMEOUT', 30))
+# cantidad de conexiones recientes sobre las que se calculan los percentiles del tiempo de conexión
+GATEWAY_METRICS_WINDOW = int(os.getenv('GATEWAY_METRICS_WINDOW', 1000))
+
+# Gateway asíncrono (httpx): lo activa djangoProject/asgi.py. Conexiones simultáneas máximas hacia los
+# servicios por worker; los requests por encima esperan una conexión libre hasta GATEWAY_POOL_TIMEOUT segundos
+GATEWAY_ASYNC = os.getenv('GATEWAY_ASYNC', 'False') == 'True'
+GATEWAY_ASYNC_MAX_CONNECTIONS = int(os.getenv('GATEWAY_ASYNC_MAX_CONNECTIONS', 2000))
+GATEWAY_POOL_TIMEOUT = float(os.getenv('GATEWAY_POOL_TIMEOUT', 10))
+
+# Passthrough: el cuerpo de la respuesta del servicio se reenvía por bloques tal cual llega (sin json() ni
+# volver a serializarlo, y sin descomprimirlo), con memoria acotada por request sin importar su tamaño
+GATEWAY_PASSTHROUGH = os.getenv('GATEWAY_PASSTHROUGH', 'False') == 'True'
+GATEWAY_STREAM_CHUNK_SIZE = int(os.getenv('GATEWAY_STREAM_CHUNK_SIZE', 64 * 1024))
+
+# Forwarding: si el request trae este header, su valor es el path del servicio y el cuerpo del cliente se
+# reenvía tal cual por bloques (sin parsearlo ni volver a serializarlo), con su Content-Type
+GATEWAY_PATH_HEADER = os.getenv('GATEWAY_PATH_HEADER', 'X-Gateway-Path')
@@ -1,51 +1,15 @@
 import os
 from datetime import timedelta
 from dotenv import load_dotenv
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
 
 load_dotenv()
 
 
-# Función para generar una clave RSA y guardarla en un archivo PEM
-def generate_rsa_key():
-    try:
-        # Generar un par de claves (clave privada y pública) para RSA
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048,
-            backend=default_backend()
-        )
-
-        private_pem = private_key.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.PKCS8,
-            encryption_algorithm=serialization.NoEncryption()
-        )
-
-        public_key = private_key.public_key()
-        public_pem = public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        )
-
-        with open('private.pem', 'wb') as private_file, open('public.pem', 'wb') as public_file:
-            private_file.write(private_pem)
-            public_file.write(public_pem)
-
-    except Exception as e:
-        raise Exception("Error al generar las claves rsa")
-
-
-# Definir las rutas de los archivos de claves
+# Rutas del par de claves por defecto. Los archivos se leen recién al firmar o verificar el primer token
+# (authentication.keyring), nunca al cargar los settings. Para generarlos: python manage.py generate_jwt_keys
 SIGNING_KEY_FILE = os.getenv('SIGNING_KEY_NAME_FILE', 'private.pem')
 VERIFYING_KEY_FILE = os.getenv('VERIFYING_KEY_NAME_FILE', 'public.pem')
 
-# Generar las claves si no existen
-if not os.path.exists(SIGNING_KEY_FILE) or not os.path.exists(VERIFYING_KEY_FILE):
-    generate_rsa_key()
-
 # Configuraciones de Simple JWT
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
@@ -53,7 +17,51 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'BLACKLIST_ENABLED': True,
-    'SIGNING_KEY': open(SIGNING_KEY_FILE, 'rb').read(),
-    'VERIFYING_KEY': open(VERIFYING_KEY_FILE, 'rb').read(),
     'ALGORITHM': 'RS256',
+    'TOKEN_USER_CLASS': 'authentication.tokens.UsuarioTokenUser',
 }
+
+# Autenticación sin estado: el usuario se arma con los claims del token, sin consultar la base de datos
+JWT_STATELESS_AUTH = os.getenv('JWT_STATELESS_AUTH', 'False') == 'True'
+# segundos que se recuerda el estado is_active e is_staff de un usuario en modo sin estado. Con 0 no se verifica
+# is_active y is_staff sale del token, que solo se invalida al cambiar con JWT_PERMISSION_CLAIMS
+JWT_ACTIVE_CACHE_TTL = int(os.getenv('JWT_ACTIVE_CACHE_TTL', 30))
+JWT_ACTIVE_CACHE_MAX_ENTRIES = int(os.getenv('JWT_ACTIVE_CACHE_MAX_ENTRIES', 10000))
+
+# Permisos en los tokens: el token lleva los permisos del usuario (bitset por pk de Permission) y su versión.
+# La autorización se resuelve con los claims, y un token con una versión de permisos vieja se rechaza (401)
+# para que el cliente lo renueve. En modo sin estado la versión se consulta con este vencimiento en segundos.
+JWT_PERMISSION_CLAIMS = os.getenv('JWT_PERMISSION_CLAIMS', 'False') == 'True'
+JWT_PERMISSIONS_VERSION_TTL = int(os.getenv('JWT_PERMISSIONS_VERSION_TTL', 30))
+
+# Key ring de JWT: lista de claves {kid, algorithm (RS256, ES256, EdDSA), private_key_file, public_key_file,
+# not_before, not_after}, o un archivo JSON con esa lista. Sin configurar se usa el par de claves de arriba.
+JWT_KEYS = None
+JWT_KEYRING_FILE = os.getenv('JWT_KEYRING_FILE', '')
+# segundos que los consumidores pueden cachear el JWKS (.well-known/jwks.json). Una clave nueva tiene que
+# agregarse con un not_before de al menos este tiempo a futuro, para que todos la conozcan antes de usarse.
+JWT_JWKS_MAX_AGE = int(os.getenv('JWT_JWKS_MAX_AGE', 86400))
+
+# Cache en memoria de los claims de tokens ya verificados (firma incluida), hasta el exp de cada token.
+# Un token verificado no se vuelve a verificar mientras esté en el cache, aunque cambien las claves en otro proceso.
+JWT_VERIFIED_CACHE_ENABLED = os.getenv('JWT_VERIFIED_CACHE_ENABLED', 'False') == 'True'
+JWT_VERIFIED_CACHE_MAX_ENTRIES = int(os.getenv('JWT_VERIFIED_CACHE_MAX_ENTRIES', 10000))
+
+# Cantidad máxima de tokens por request en token/verify/batch/
+JWT_VERIFY_BATCH_MAX_TOKENS = int(os.getenv('JWT_VERIFY_BATCH_MAX_TOKENS', 100))
+
+# Filtro de Bloom en memoria con los jti de la blacklist: si descarta el token no se consulta la base.
+# Los tokens agregados a la blacklist desde otro proceso se ven recién en la siguiente sincronización,
+# por lo que un refresh token rotado puede reutilizarse en otro proceso durante, como máximo, SYNC_INTERVAL segundos.
+JWT_BLACKLIST_FILTER_ENABLED = os.getenv('JWT_BLACKLIST_FILTER_ENABLED', 'False') == 'True'
+JWT_BLACKLIST_FILTER_SYNC_INTERVAL = float(os.getenv('JWT_BLACKLIST_FILTER_SYNC_INTERVAL', 5))
+# ids ya vistos que se releen en cada sincronización: un insert con un id menor que se confirma tarde
+# (transacciones concurrentes) se ve igual, siempre que no haya más de este número de ids posteriores
+JWT_BLACKLIST_FILTER_SYNC_MARGIN = int(os.getenv('JWT_BLACKLIST_FILTER_SYNC_MARGIN', 1000))
+JWT_BLACKLIST_FILTER_REBUILD_INTERVAL = float(os.getenv('JWT_BLACKLIST_FILTER_REBUILD_INTERVAL', 3600))
+JWT_BLACKLIST_FILTER_CAPACITY = int(os.getenv('JWT_BLACKLIST_FILTER_CAPACITY', 100000))
+JWT_BLACKLIST_FILTER_ERROR_RATE = float(os.getenv('JWT_BLACKLIST_FILTER_ERROR_RATE', 0.001))
+
+# Poda de tokens vencidos (prune_tokens): filas por bloque y segundos de pausa entre bloques
+JWT_TOKEN_PRUNE_CHUNK_SIZE = int(os.getenv('JWT_TOKEN_PRUNE_CHUNK_SIZE', 1000))
+JWT_TOKEN_PRUNE_PAUSE = float(os.getenv('JWT_TOKEN_PRUNE_PAUSE', 0.1))
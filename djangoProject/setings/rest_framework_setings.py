@@ -2,6 +2,6 @@
 # Configuración de Django Rest Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.backends.UsuarioJWTAuthentication',
     ]
 }
\ No newline at end of file
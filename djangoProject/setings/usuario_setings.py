@@ -0,0 +1,40 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Paginación del listado de usuarios
+USUARIO_PAGE_SIZE = int(os.getenv('USUARIO_PAGE_SIZE', 50))
+USUARIO_MAX_PAGE_SIZE = int(os.getenv('USUARIO_MAX_PAGE_SIZE', 500))
+
+# Cantidad de filas leídas por bloque en la exportación de usuarios
+USUARIO_EXPORT_CHUNK_SIZE = int(os.getenv('USUARIO_EXPORT_CHUNK_SIZE', 2000))
+
+# Alta masiva de usuarios
+USUARIO_BULK_MAX_SIZE = int(os.getenv('USUARIO_BULK_MAX_SIZE', 5000))
+USUARIO_BULK_BATCH_SIZE = int(os.getenv('USUARIO_BULK_BATCH_SIZE', 500))
+# procesos usados para hashear contraseñas, 0 usa la cantidad de núcleos
+USUARIO_BULK_HASH_WORKERS = int(os.getenv('USUARIO_BULK_HASH_WORKERS', 0))
+# por debajo de esta cantidad de contraseñas se hashea sin el pool de procesos
+USUARIO_BULK_HASH_MIN_PARALLEL = int(os.getenv('USUARIO_BULK_HASH_MIN_PARALLEL', 16))
+
+# Cantidad máxima de ids por consulta en lote
+USUARIO_BATCH_MAX_IDS = int(os.getenv('USUARIO_BATCH_MAX_IDS', 500))
+
+# Largo mínimo del texto de búsqueda de usuarios
+USUARIO_SEARCH_MIN_LENGTH = int(os.getenv('USUARIO_SEARCH_MIN_LENGTH', 2))
+
+# Backend de autenticación: el login asíncrono verifica la contraseña en el pool de abajo
+AUTHENTICATION_BACKENDS = ['authentication.backends.UsuarioModelBackend']
+
+# Login asíncrono: lo activa djangoProject/asgi.py. Bajo WSGI el login es la vista de simplejwt
+LOGIN_ASYNC = os.getenv('LOGIN_ASYNC', 'False') == 'True'
+
+# Login: threads que verifican contraseñas (0 usa la cantidad de núcleos) y cantidad máxima de
+# verificaciones en curso o en espera; por encima se rechaza el login con 503
+LOGIN_HASH_WORKERS = int(os.getenv('LOGIN_HASH_WORKERS', 0))
+LOGIN_HASH_MAX_PENDING = int(os.getenv('LOGIN_HASH_MAX_PENDING', 64))
+# segundos sugeridos al cliente (Retry-After) cuando el login se rechaza por saturación
+LOGIN_RETRY_AFTER = int(os.getenv('LOGIN_RETRY_AFTER', 1))
+# cantidad de logins recientes sobre los que se calculan los percentiles de latencia
+LOGIN_METRICS_WINDOW = int(os.getenv('LOGIN_METRICS_WINDOW', 1000))
@@ -18,6 +18,10 @@ from datetime import timedelta
 from .setings.jwt_setings import *
 from .setings.swagger_setings import *
 from .setings.rest_framework_setings import *
+from .setings.usuario_setings import *
+from .setings.cache_setings import *
+from .setings.password_setings import *
+from .setings.gateway_setings import *
 
 # carga las varibles de entorno
 load_dotenv()
@@ -0,0 +1,203 @@
+import asyncio
+import http.cookiejar
+import threading
+import time
+import weakref
+import httpx
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from authentication.metrics import LatencyMetrics
+
+
+class GatewayMetrics:
+    """
+    Requests hechos por el gateway, conexiones nuevas (el resto reutilizó una conexión del pool)
+    y tiempo de conexión (TCP + TLS). Los valores son por proceso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.conexiones = LatencyMetrics(window=settings.GATEWAY_METRICS_WINDOW)
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_connect(self, segundos: float):
+        self.conexiones.record('nueva', segundos)
+
+    def clear(self):
+        with self._lock:
+            self.requests = 0
+        self.conexiones.clear()
+
+    def stats(self):
+        conexiones = self.conexiones.stats()
+        nuevas = conexiones['resultados'].get('nueva', 0)
+        with self._lock:
+            requests_ = self.requests
+        return {
+            'requests': requests_,
+            'conexiones_nuevas': nuevas,
+            'conexiones_reutilizadas': max(0, requests_ - nuevas),
+            'reuse_rate': max(0.0, 1 - nuevas / requests_) if requests_ else 0.0,
+            'connect_p50_ms': conexiones['p50_ms'],
+            'connect_p99_ms': conexiones['p99_ms'],
+        }
+
+
+gateway_metrics = GatewayMetrics()
+
+
+class _TimedConnectMixin:
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            gateway_metrics.record_connect(time.perf_counter() - inicio)
+
+
+class TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter que mide las conexiones nuevas y su tiempo de conexión.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        gateway_metrics.record_request()
+        return super().send(request, **kwargs)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _sin_cookies():
+    # el cliente es compartido por los requests de todos los usuarios: no guarda ni envía cookies del servicio
+    return http.cookiejar.DefaultCookiePolicy(allowed_domains=[])
+
+
+def get_session() -> requests.Session:
+    """
+    Session de requests del proceso, con un pool de conexiones keep-alive compartido por todas las vistas
+    del gateway. No guarda cookies, para que las de un usuario no se envíen en los requests de otro.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.cookies.set_policy(_sin_cookies())
+                adapter = PooledHTTPAdapter(
+                    pool_connections=settings.GATEWAY_POOL_CONNECTIONS,
+                    pool_maxsize=settings.GATEWAY_POOL_MAXSIZE,
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                if not settings.GATEWAY_KEEP_ALIVE:
+                    session.headers['Connection'] = 'close'
+                _session = session
+    return _session
+
+
+# un AsyncClient por event loop: sus conexiones no se pueden usar desde otro loop
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    AsyncClient de httpx del event loop actual, con un pool de conexiones keep-alive compartido por todos
+    los requests del worker. Bajo ASGI hay un solo loop por worker, así que el pool es uno por proceso.
+    Igual que get_session(), no guarda cookies.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.GATEWAY_ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GATEWAY_POOL_MAXSIZE if settings.GATEWAY_KEEP_ALIVE else 0,
+            ),
+            timeout=httpx.Timeout(
+                settings.GATEWAY_READ_TIMEOUT,
+                connect=settings.GATEWAY_CONNECT_TIMEOUT,
+                pool=settings.GATEWAY_POOL_TIMEOUT,
+            ),
+            verify=False,
+            cookies=http.cookiejar.CookieJar(policy=_sin_cookies()),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def connection_trace():
+    """
+    Trace de httpcore que registra en gateway_metrics el tiempo de conexión (TCP + TLS) cuando el request
+    abre una conexión nueva.
+
+    :return: callback para extensions={'trace': ...}
+    """
+    inicio = {}
+
+    async def trace(evento, info):
+        if evento in ('connection.connect_tcp.started', 'connection.start_tls.started'):
+            inicio[evento] = time.perf_counter()
+        elif evento == 'connection.connect_tcp.complete':
+            inicio['conexion'] = time.perf_counter() - inicio.pop('connection.connect_tcp.started')
+        elif evento == 'connection.start_tls.complete':
+            inicio['conexion'] += time.perf_counter() - inicio.pop('connection.start_tls.started')
+        elif evento.endswith('.send_request_headers.started') and 'conexion' in inicio:
+            # la conexión ya está lista (http11 o http2)
+            gateway_metrics.record_connect(inicio.pop('conexion'))
+
+    return trace
+
+
+def get_timeout():
+    return settings.GATEWAY_CONNECT_TIMEOUT, settings.GATEWAY_READ_TIMEOUT
+
+
+def reset_session(**kwargs):
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+    # los AsyncClient se descartan sin cerrar: su loop puede no estar corriendo
+    _async_clients.clear()
+
+
+def _on_setting_changed(setting, **kwargs):
+    if setting.startswith('GATEWAY_'):
+        reset_session()
+
+
+setting_changed.connect(_on_setting_changed)
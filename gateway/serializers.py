@@ -13,4 +13,8 @@ class GatewaySerializer(serializers.Serializer):
 
         if not value.startswith(services[0]):
             raise serializers.ValidationError(f"El campo 'path' debe comenzar con {services[0]}")
+
+        # con '..' el path saldría del prefijo una vez normalizado por el cliente HTTP
+        if any(segmento in ('.', '..') for segmento in value.split('?')[0].split('/')):
+            raise serializers.ValidationError("El campo 'path' no puede tener segmentos '.' o '..'")
         return value
@@ -1,3 +1,448 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.test import TestCase, TransactionTestCase, Client, RequestFactory, AsyncRequestFactory, \
+    override_settings
+from django.urls import resolve
+from authentication.models import Usuario
+from .client import gateway_metrics, reset_session
+from .views import GastosServiceView, AsyncGastosServiceView, DocsGastosServiceView
 
-# Create your tests here.
+
+class _ServicioGastos(BaseHTTPRequestHandler):
+    # HTTP/1.1 para que el cliente pueda reutilizar la conexión
+    protocol_version = 'HTTP/1.1'
+
+    def _responder(self):
+        largo = int(self.headers.get('Content-Length') or 0)
+        recibido = self.rfile.read(largo) if largo else b''
+        if self.headers.get('Transfer-Encoding') == 'chunked':
+            recibido = self._leer_chunked()
+        status = 404 if self.path.startswith('/api/no-existe') else 200
+        body = json.dumps({'method': self.command, 'path': self.path, 'body': recibido.decode('utf-8'),
+                           'content_type': self.headers.get('Content-Type'),
+                           'cookie': self.headers.get('Cookie')}).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Cache-Control': 'public, max-age=60', 'ETag': '"v1"'}
+        if self.path.startswith('/api/sesion'):
+            headers['Set-Cookie'] = 'sesion=de-otro-usuario; Path=/'
+
+        # revalidación: comparación débil del ETag, como indica el RFC 9110 para If-None-Match
+        if self.command == 'GET' and (self.headers.get('If-None-Match', '').removeprefix('W/') == '"v1"'
+                                      or self.headers.get('If-Modified-Since')):
+            self.send_response(304)
+            for nombre in ('Cache-Control', 'ETag'):
+                self.send_header(nombre, headers[nombre])
+            self.end_headers()
+            return
+
+        if self.path.startswith('/api/grande'):
+            body = json.dumps([{'id': i, 'descripcion': 'gasto'} for i in range(50000)]).encode('utf-8')
+            if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                body = gzip.compress(body)
+                headers['Content-Encoding'] = 'gzip'
+
+        self.send_response(status)
+        for nombre, valor in headers.items():
+            self.send_header(nombre, valor)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _leer_chunked(self):
+        recibido = b''
+        while largo := int(self.rfile.readline().strip(), 16):
+            recibido += self.rfile.read(largo)
+            self.rfile.readline()
+        self.rfile.readline()
+        return recibido
+
+    do_GET = do_POST = do_PUT = do_DELETE = _responder
+
+    def log_message(self, *args):
+        pass
+
+
+class _Servidor(ThreadingHTTPServer):
+    # con la cola por defecto (5) el sistema descarta conexiones cuando llegan muchos requests a la vez
+    request_queue_size = 128
+
+
+class GatewayCases:
+    """
+    Casos comunes a la vista sincrónica y a la asíncrona, contra un servicio HTTP local.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = _Servidor(('127.0.0.1', 0), _ServicioGastos)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.host = f'http://127.0.0.1:{cls.servidor.server_address[1]}/'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+        self.url_gateway = '/gateway/api/service_gastos/'
+        reset_session()
+        gateway_metrics.clear()
+
+        for view in (GastosServiceView, AsyncGastosServiceView):
+            patcher = mock.patch.object(view, 'service_host', self.host)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.user = Usuario.objects.create_user(username='test', password='test1234', email='test@mail.com')
+        token = self.client.post(
+            path='/authentication/api/token/',
+            data={'email': 'test@mail.com', 'password': 'test1234'}
+        ).json()['access']
+        self.headers = {'Authorization': f'Bearer {token}'}
+
+    def _send(self, method, body, content_type, headers, url=None, **extra):
+        return self.client.generic(method, url or self.url_gateway, data=body, content_type=content_type,
+                                   headers=headers, **extra)
+
+    def _proxy(self, method, data):
+        return self._send(method, json.dumps(data), 'application/json', self.headers)
+
+    def _forward(self, method, path, body, content_type='text/csv'):
+        return self._send(method, body, content_type, {**self.headers, 'X-Gateway-Path': path})
+
+    def test_pool_de_conexiones(self):
+        """
+        Caso de éxito: todos los verbos reutilizan la misma conexión keep-alive
+        """
+        for method in ('GET', 'POST', 'PUT', 'DELETE'):
+            response = self._proxy(method, {'path': 'api/gastos', 'monto': 10})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['method'], method)
+
+        metricas = gateway_metrics.stats()
+        self.assertEqual(metricas['requests'], 4)
+        self.assertEqual(metricas['conexiones_nuevas'], 1)
+        self.assertEqual(metricas['conexiones_reutilizadas'], 3)
+
+        """
+        Caso de éxito: sin keep-alive cada request abre una conexión
+        """
+        with self.settings(GATEWAY_KEEP_ALIVE=False):
+            gateway_metrics.clear()
+            for _ in range(2):
+                self._proxy('GET', {'path': 'api/gastos'})
+            self.assertEqual(gateway_metrics.stats()['conexiones_nuevas'], 2)
+
+    def _contenido(self, response):
+        return b''.join(response.streaming_content)
+
+    @override_settings(GATEWAY_PASSTHROUGH=True, GATEWAY_STREAM_CHUNK_SIZE=8192)
+    def test_passthrough(self):
+        """
+        Caso de éxito: el cuerpo del servicio se reenvía por bloques sin decodificar, con su Content-Encoding
+        """
+        self.headers['Accept-Encoding'] = 'gzip'
+        response = self._proxy('GET', {'path': 'api/grande'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+        contenido = self._contenido(response)
+        self.assertEqual(int(response['Content-Length']), len(contenido))
+        # el cuerpo es el del servicio byte a byte: el ETag se mantiene fuerte
+        self.assertEqual(response['ETag'], '"v1"')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(len(json.loads(gzip.decompress(contenido))), 50000)
+
+        """
+        Caso de éxito: si el cliente no acepta gzip el servicio responde sin comprimir
+        """
+        del self.headers['Accept-Encoding']
+        response = self._proxy('POST', {'path': 'api/grande', 'monto': 10})
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(len(json.loads(self._contenido(response))), 50000)
+
+        """
+        Caso de fallo: un error del servicio mantiene la respuesta de error del gateway
+        """
+        response = self._proxy('GET', {'path': 'api/no-existe'})
+        self.assertEqual(response.status_code, 500)
+
+    def test_forwarding(self):
+        """
+        Caso de éxito: con el header X-Gateway-Path el cuerpo llega al servicio sin cambios, con su Content-Type
+        """
+        for method in ('POST', 'PUT', 'DELETE'):
+            response = self._forward(method, 'api/gastos/importar', 'fecha;monto\n2024-01-01;10')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['method'], method)
+            self.assertEqual(response.json()['path'], '/api/gastos/importar')
+            self.assertEqual(response.json()['body'], 'fecha;monto\n2024-01-01;10')
+            self.assertEqual(response.json()['content_type'], 'text/csv')
+
+        """
+        Caso de éxito: el cuerpo no se parsea, aunque no sea un JSON válido
+        """
+        response = self._forward('POST', 'api/gastos', '{"monto": 10,', content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['body'], '{"monto": 10,')
+
+        """
+        Caso de éxito: un cuerpo grande se reenvía completo sin leerlo entero (request.body superaría el límite),
+        y un GET sin cuerpo usa el path del header
+        """
+        grande = 'x' * (5 * 1024 * 1024)
+        with self.settings(DATA_UPLOAD_MAX_MEMORY_SIZE=1024):
+            response = self._forward('PUT', 'api/gastos', grande)
+        self.assertEqual(response.json()['body'], grande)
+
+        response = self._forward('GET', 'api/gastos', '')
+        self.assertEqual(response.json()['method'], 'GET')
+        self.assertEqual(response.json()['body'], '')
+
+        """
+        Caso de fallo: el path del header se valida igual que el del body
+        """
+        response = self._forward('POST', 'gastos', 'fecha;monto')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('path', response.json())
+
+    @override_settings(GATEWAY_PASSTHROUGH=True)
+    def test_passthrough_asgi(self):
+        """
+        Caso de éxito: bajo ASGI las vistas sincrónicas reenvían el cuerpo con un iterador asíncrono
+        """
+        request = AsyncRequestFactory().get(f'{self.url_gateway}docs/', headers=self.headers)
+        with mock.patch.object(DocsGastosServiceView, 'service_host', self.host):
+            response = DocsGastosServiceView.as_view()(request)
+        self.assertTrue(response.is_async)
+
+        async def leer():
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        self.assertEqual(json.loads(async_to_sync(leer)())['path'], '/swagger/v1/swagger.json')
+
+    def test_forwarding_chunked(self):
+        """
+        Caso de éxito: un cuerpo chunked (sin Content-Length) se reenvía completo si el servidor WSGI
+        indica wsgi.input_terminated
+        """
+        headers = {**self.headers, 'X-Gateway-Path': 'api/gastos', 'Transfer-Encoding': 'chunked'}
+        chunked = {'CONTENT_LENGTH': '', 'wsgi.input': io.BytesIO(b'fecha;monto\n2024-01-01;10')}
+        response = self._send('POST', 'x', 'text/csv', headers, **chunked, **{'wsgi.input_terminated': True})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['body'], 'fecha;monto\n2024-01-01;10')
+
+        """
+        Caso de fallo: sin wsgi.input_terminated el cuerpo no se puede leer, responde 411 en lugar de
+        reenviar un cuerpo vacío
+        """
+        chunked['wsgi.input'] = io.BytesIO(b'fecha;monto')
+        response = self._send('POST', 'x', 'text/csv', headers, **chunked)
+        self.assertEqual(response.status_code, 411)
+
+    def test_revalidacion(self):
+        """
+        Caso de éxito: con el ETag que devolvió el gateway, un GET sin cambios en el servicio responde 304 sin cuerpo
+        """
+        url = f'{self.url_gateway}api/gastos'
+        response = self._send('GET', '', 'application/json', self.headers, url=url)
+        etag = response['ETag']
+
+        response = self._send('GET', '', 'application/json', {**self.headers, 'If-None-Match': etag}, url=url)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('private', response['Cache-Control'])
+
+        response = self._send('GET', '', 'application/json',
+                              {**self.headers, 'If-Modified-Since': 'Sat, 17 Oct 2026 00:00:00 GMT'}, url=url)
+        self.assertEqual(response.status_code, 304)
+
+        """
+        Caso de éxito: también con el path en el body y en passthrough, donde el ETag sigue siendo fuerte
+        """
+        response = self._send('GET', json.dumps({'path': 'api/gastos'}), 'application/json',
+                              {**self.headers, 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        with override_settings(GATEWAY_PASSTHROUGH=True):
+            response = self._send('GET', '', 'application/json', {**self.headers, 'If-None-Match': '"v1"'}, url=url)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], '"v1"')
+
+        """
+        Caso de éxito: las condiciones solo se reenvían en GET
+        """
+        response = self._send('POST', 'fecha;monto', 'text/csv', {**self.headers, 'If-None-Match': etag}, url=url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_path_en_url(self):
+        """
+        Caso de éxito: con el path en la URL se reenvía el query string y los headers de cache del servicio
+        """
+        url = f'{self.url_gateway}api/gastos?page=2&orden=fecha'
+        response = self._send('GET', '', 'application/json', self.headers, url=url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['path'], '/api/gastos?page=2&orden=fecha')
+        self.assertEqual(response['ETag'], 'W/"v1"')
+
+        """
+        Caso de éxito: aunque el servicio declare la respuesta pública, solo se cachea en el cliente y por token
+        """
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('public', response['Cache-Control'])
+        self.assertIn('max-age=60', response['Cache-Control'])
+        self.assertIn('Authorization', response['Vary'])
+
+        """
+        Caso de éxito: el cuerpo se reenvía sin parsear, como con el header
+        """
+        response = self._send('POST', 'fecha;monto', 'text/csv', self.headers, url=f'{self.url_gateway}api/gastos')
+        self.assertEqual(response.json()['method'], 'POST')
+        self.assertEqual(response.json()['body'], 'fecha;monto')
+
+        """
+        Caso de éxito: docs/ sigue siendo la documentación del servicio
+        """
+        self.assertEqual(resolve(f'{self.url_gateway}docs/').url_name, 'docs_service_gastos')
+
+        """
+        Caso de fallo: la URL se valida igual que el path del body
+        """
+        for subpath in ('gastos', 'api/../admin'):
+            response = self._send('GET', '', 'application/json', self.headers, url=f'{self.url_gateway}{subpath}')
+            self.assertEqual(response.status_code, 400)
+
+    def test_sin_cookies(self):
+        """
+        Caso de éxito: una cookie del servicio no se envía en los requests siguientes (de cualquier usuario)
+        """
+        response = self._proxy('GET', {'path': 'api/sesion'})
+        self.assertEqual(response.status_code, 200)
+
+        response = self._proxy('GET', {'path': 'api/gastos'})
+        self.assertIsNone(response.json()['cookie'])
+
+    def test_errores(self):
+        """
+        Caso de fallo: path inválido (400) y error del servicio (500)
+        """
+        response = self._proxy('GET', {'path': 'gastos'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self._proxy('GET', {'path': 'api/no-existe'})
+        self.assertEqual(response.status_code, 500)
+
+
+class TestGateway(GatewayCases, TestCase):
+    pass
+
+
+class TestAsyncGateway(GatewayCases, TransactionTestCase):
+    """
+    Los mismos casos de TestGateway con la vista asíncrona. La autenticación corre en otro thread, con otra
+    conexión a la base de datos, así que los datos del test tienen que estar confirmados.
+    """
+
+    def _request(self, method, data):
+        return RequestFactory().generic(method, self.url_gateway, data=json.dumps(data),
+                                        content_type='application/json', headers=self.headers)
+
+    def _send(self, method, body, content_type, headers, url=None, **extra):
+        request = RequestFactory().generic(method, url or self.url_gateway, data=body, content_type=content_type,
+                                           headers=headers, **extra)
+        kwargs = resolve(request.path_info).kwargs
+
+        async def proxy():
+            response = await AsyncGastosServiceView.as_view()(request, **kwargs)
+            # el cuerpo en streaming se lee en el mismo event loop que hizo el request
+            if response.streaming:
+                response.contenido = b''.join([chunk async for chunk in response.streaming_content])
+            return response
+
+        response = async_to_sync(proxy)()
+        if not response.streaming:
+            response.json = lambda: json.loads(response.content)
+        return response
+
+    def _contenido(self, response):
+        return response.contenido
+
+    def test_pool_de_conexiones(self):
+        """
+        Caso de éxito: en el mismo event loop (como bajo ASGI) todos los verbos reutilizan la conexión
+        """
+        view = AsyncGastosServiceView.as_view()
+
+        async def secuenciales():
+            return [await view(self._request(method, {'path': 'api/gastos'}))
+                    for method in ('GET', 'POST', 'PUT', 'DELETE')]
+
+        responses = async_to_sync(secuenciales)()
+        self.assertEqual([response.status_code for response in responses], [200] * 4)
+
+        metricas = gateway_metrics.stats()
+        self.assertEqual(metricas['requests'], 4)
+        self.assertEqual(metricas['conexiones_nuevas'], 1)
+        self.assertIsNotNone(metricas['connect_p50_ms'])
+
+    def test_sin_cookies(self):
+        """
+        Caso de éxito: en el mismo event loop (el mismo AsyncClient) una cookie del servicio no se envía
+        en los requests siguientes
+        """
+        view = AsyncGastosServiceView.as_view()
+
+        async def secuenciales():
+            return [await view(self._request('GET', {'path': path})) for path in ('api/sesion', 'api/gastos')]
+
+        responses = async_to_sync(secuenciales)()
+        self.assertEqual([response.status_code for response in responses], [200] * 2)
+        self.assertIsNone(json.loads(responses[1].content)['cookie'])
+
+    def test_conexiones_db_del_executor(self):
+        """
+        Caso de éxito: la autenticación en un thread del executor cierra las conexiones a la base vencidas
+        antes y después de usarlas, como el ciclo de request de django
+        """
+        threads = []
+        with mock.patch('gateway.views.close_old_connections',
+                        side_effect=lambda: threads.append(threading.get_ident())) as close:
+            response = self._proxy('GET', {'path': 'api/gastos'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(close.call_count, 2)
+        self.assertNotIn(threading.get_ident(), threads)
+
+    def test_requests_concurrentes(self):
+        """
+        Caso de éxito: varios requests en curso a la vez en el mismo event loop
+        """
+        view = AsyncGastosServiceView.as_view()
+
+        async def concurrentes():
+            return await asyncio.gather(*(
+                view(self._request('POST', {'path': f'api/gastos/{i}'})) for i in range(20)
+            ))
+
+        responses = async_to_sync(concurrentes)()
+        self.assertEqual([response.status_code for response in responses], [200] * 20)
+        self.assertEqual(json.loads(responses[7].content)['path'], '/api/gastos/7')
+
+    def test_sin_autenticacion(self):
+        """
+        Caso de fallo: sin token responde 401, igual que la vista sincrónica
+        """
+        self.headers = {}
+        response = self._proxy('GET', {'path': 'api/gastos'})
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('detail', response.json())
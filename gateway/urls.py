@@ -1,7 +1,15 @@
+from django.conf import settings
 from django.urls import path, include
-from .views import GastosServiceView, DocsGastosServiceView
+from .views import GastosServiceView, AsyncGastosServiceView, DocsGastosServiceView, GatewayMetricsView
+
+# bajo ASGI el proxy es asíncrono (djangoProject/asgi.py activa GATEWAY_ASYNC)
+ServiceView = AsyncGastosServiceView if settings.GATEWAY_ASYNC else GastosServiceView
 
 urlpatterns = [
-    path('service_gastos/', GastosServiceView.as_view(), name='service_gastos'),
-    path('service_gastos/docs/', DocsGastosServiceView.as_view(), name='docs_service_gastos')
+    path('service_gastos/', ServiceView.as_view(), name='service_gastos'),
+    path('service_gastos/docs/', DocsGastosServiceView.as_view(), name='docs_service_gastos'),
+    # path del servicio en la URL, ej. service_gastos/api/gastos?page=2: los GET se pueden cachear.
+    # Va después de docs/ para no tomar esa ruta
+    path('service_gastos/<path:subpath>', ServiceView.as_view(), name='service_gastos_path'),
+    path('metrics/', GatewayMetricsView.as_view(), name='gateway_metrics'),
 ]
\ No newline at end of file
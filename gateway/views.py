@@ -1,17 +1,214 @@
 import os
+import httpx
 import requests
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django.http import HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.views import View
+from rest_framework.exceptions import APIException, NotAuthenticated, AuthenticationFailed
 from rest_framework.generics import GenericAPIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import status
 from rest_framework.decorators import action
 from django.conf import settings
 from .serializers import GatewaySerializer
+from .client import get_session, get_timeout, get_async_client, connection_trace, gateway_metrics
 
 
 # Create your views here.
 
 
+# headers de cache del servicio que se reenvían al cliente, así las respuestas a GET se pueden cachear
+CACHE_HEADERS = ('Cache-Control', 'ETag', 'Last-Modified', 'Expires', 'Vary')
+
+
+def copy_cache_headers(upstream, response, passthrough=False):
+    """
+    Copia a la respuesta los headers de cache del servicio. Los requests al gateway son autenticados, así que
+    la respuesta se cachea solo en el cliente (private, Vary: Authorization) aunque el servicio la declare
+    pública. El ETag del servicio sigue siendo fuerte solo si el cuerpo se reenvía sin cambios (passthrough).
+    """
+    for header in CACHE_HEADERS:
+        if header in upstream.headers:
+            response[header] = upstream.headers[header]
+
+    if not passthrough and response.has_header('ETag') and not response['ETag'].startswith('W/'):
+        # el cuerpo se vuelve a serializar: es equivalente, pero no idéntico byte a byte
+        response['ETag'] = f"W/{response['ETag']}"
+    patch_cache_control(response, private=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def not_modified_response(upstream, passthrough=False):
+    """
+    El servicio respondió 304 a una revalidación (If-None-Match / If-Modified-Since): se responde 304 sin cuerpo,
+    con sus headers de cache, sin leer ni volver a serializar nada.
+    """
+    return copy_cache_headers(upstream, HttpResponseNotModified(), passthrough=passthrough)
+
+
+def _passthrough_headers(response, streaming):
+    # el cuerpo se reenvía tal cual, comprimido o no, así que su largo y encoding son los del servicio
+    for header in ('Content-Encoding', 'Content-Length'):
+        if header in response.headers:
+            streaming[header] = response.headers[header]
+    return copy_cache_headers(response, streaming, passthrough=True)
+
+
+def _iter_raw(response):
+    try:
+        yield from response.raw.stream(settings.GATEWAY_STREAM_CHUNK_SIZE, decode_content=False)
+    finally:
+        # devuelve la conexión al pool
+        response.close()
+
+
+async def _aiter_sync(iterador):
+    # bajo ASGI cada bloque del iterador sincrónico se lee en un thread, sin cargar todo el cuerpo en memoria
+    siguiente = sync_to_async(next, thread_sensitive=False)
+    try:
+        while (chunk := await siguiente(iterador, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(iterador.close, thread_sensitive=False)()
+
+
+async def _aiter_raw(response):
+    try:
+        async for chunk in response.aiter_raw(settings.GATEWAY_STREAM_CHUNK_SIZE):
+            yield chunk
+    finally:
+        await response.aclose()
+
+
+def passthrough_response(response, asynchronous=False):
+    """
+    Respuesta que reenvía el cuerpo del servicio por bloques, sin decodificarlo ni cargarlo entero en memoria,
+    con su status, Content-Type y Content-Encoding. Acepta respuestas de requests (stream=True) y de httpx.
+
+    :param asynchronous: True si el request se atiende bajo ASGI, donde el cuerpo tiene que ser un iterador
+        asíncrono (Django consume entero uno sincrónico antes de enviarlo)
+    """
+    content_type = response.headers.get('Content-Type')
+    if isinstance(response, httpx.Response):
+        contenido = _aiter_raw(response)
+    elif asynchronous:
+        contenido = _aiter_sync(_iter_raw(response))
+    else:
+        contenido = _iter_raw(response)
+    streaming = StreamingHttpResponse(contenido, status=response.status_code, content_type=content_type)
+    return _passthrough_headers(response, streaming)
+
+
+def raise_for_status(response):
+    # con stream=True la conexión queda tomada hasta leer o cerrar la respuesta
+    if response.status_code >= 400:
+        response.close()
+    response.raise_for_status()
+
+
+def forward_path(request, subpath=None):
+    """
+    Path del servicio en el modo forwarding: el de la URL (service_gastos/<path>) o el del header
+    GATEWAY_PATH_HEADER. None si el request usa la forma con el path en el body.
+    """
+    if subpath is not None:
+        return subpath
+    return request.headers.get(settings.GATEWAY_PATH_HEADER)
+
+
+def with_query_string(request, path):
+    query_string = request.META.get('QUERY_STRING')
+    return f'{path}?{query_string}' if query_string else path
+
+
+class LengthRequired(APIException):
+    status_code = status.HTTP_411_LENGTH_REQUIRED
+    default_detail = 'El cuerpo del request necesita Content-Length'
+    default_code = 'length_required'
+
+
+def body_stream(request):
+    """
+    Archivo del que se lee el cuerpo del request del cliente, o None si no tiene cuerpo.
+
+    Con Transfer-Encoding: chunked (sin Content-Length) bajo WSGI, Django limita la lectura del request a
+    0 bytes: el cuerpo se lee de wsgi.input, pero solo si el servidor indica con wsgi.input_terminated que
+    esa lectura termina al final del cuerpo. Bajo ASGI el request ya tiene el cuerpo completo.
+
+    :param request: HttpRequest de Django
+    :raise LengthRequired: el cuerpo es chunked y el servidor WSGI no permite leerlo
+    """
+    if int(request.META.get('CONTENT_LENGTH') or 0) > 0:
+        return request
+    if 'HTTP_TRANSFER_ENCODING' not in request.META:
+        return None
+    if isinstance(request, ASGIRequest):
+        return request
+    if request.META.get('wsgi.input_terminated'):
+        return request.META['wsgi.input']
+    raise LengthRequired()
+
+
+class RequestBody:
+    """
+    Cuerpo del request del cliente como archivo de solo lectura, para que requests lo envíe al servicio por
+    bloques a medida que lo lee (con su Content-Length, o chunked si no se conoce) sin cargarlo en memoria.
+    """
+
+    def __init__(self, stream, largo: int):
+        self._stream = stream
+        self._largo = largo
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+    def __iter__(self):
+        return iter(lambda: self._stream.read(settings.GATEWAY_STREAM_CHUNK_SIZE), b'')
+
+    def __len__(self):
+        return self._largo
+
+    def __bool__(self):
+        # requests reemplaza un data falso por {} (data or {}): con largo 0 (chunked) el cuerpo igual se envía
+        return True
+
+
+async def _aiter_body(stream):
+    # bajo ASGI Django ya recibió el cuerpo en un archivo temporal (en disco si es grande): se lee por bloques
+    while chunk := stream.read(settings.GATEWAY_STREAM_CHUNK_SIZE):
+        yield chunk
+
+
+def upstream_headers(request, raw=False):
+    """
+    Headers del request al servicio. Con raw el cuerpo del cliente se reenvía tal cual, con su Content-Type.
+    """
+    headers = {'Content-Type': 'application/json'}
+    if raw:
+        headers = {}
+        for header in ('Content-Type', 'Content-Length'):
+            if request.headers.get(header):
+                headers[header] = request.headers[header]
+    if settings.GATEWAY_PASSTHROUGH:
+        # el servicio comprime solo si el cliente acepta esa compresión, porque el cuerpo se reenvía sin decodificar
+        headers['Accept-Encoding'] = request.META.get('HTTP_ACCEPT_ENCODING', 'identity')
+    if request.method == 'GET':
+        # revalidación con el ETag / Last-Modified que se copió del servicio: si no cambió responde 304
+        for header in ('If-None-Match', 'If-Modified-Since'):
+            if request.headers.get(header):
+                headers[header] = request.headers[header]
+    return headers
+
+
 class GastosServiceView(GenericAPIView):
     service_host = settings.HOST_GASTOS_SERVICE
     serializer_class = GatewaySerializer
@@ -26,67 +223,190 @@ class GastosServiceView(GenericAPIView):
         path = request.data['path']
         return path, None
 
-    def get(self, request):
-        path, error_response = self.validate_and_extract_path(request)
+    def get_forward_path(self, request, subpath=None):
+        """
+        Path del modo forwarding (de la URL o del header GATEWAY_PATH_HEADER), validado igual que el del body
+        y con el query string del request.
+
+        :return: (path, None), (None, None) si el request no usa el modo forwarding o (None, respuesta de error)
+        """
+        path = forward_path(request, subpath)
+        if path is None:
+            return None, None
+
+        serializer = self.get_serializer(data={'path': path})
+        if not serializer.is_valid():
+            return None, Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return with_query_string(request, path), None
+
+    def proxy(self, request, method, subpath=None):
+        path, error_response = self.get_forward_path(request, subpath)
         if error_response:
             return error_response
 
-        url = f'{self.service_host}{path}'
-        try:
-            headers = {'Content-Type': 'application/json'}
-            response = requests.get(url, headers=headers, verify=False)
-            response.raise_for_status()
-            return Response(response.json(), status=response.status_code)
-        except requests.exceptions.RequestException as e:
-            return Response(f'Error en la solicitud: {str(e)}', status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if path is not None:
+            # el cuerpo no se parsea: se reenvía al servicio por bloques a medida que llega
+            body = None
+            stream = body_stream(request._request)
+            if stream is not None:
+                body = RequestBody(stream, int(request.META.get('CONTENT_LENGTH') or 0))
+            return self.send(request, method, path, data=body, headers=upstream_headers(request, raw=True))
 
-    def post(self, request):
         path, error_response = self.validate_and_extract_path(request)
         if error_response:
             return error_response
 
-        request.data.pop('path')
-        body = request.data
+        body = None
+        if method != 'GET':
+            request.data.pop('path')
+            body = request.data
+        return self.send(request, method, path, json=body, headers=upstream_headers(request))
+
+    def send(self, request, method, path, **kwargs):
         url = f'{self.service_host}{path}'
         try:
-            headers = {'Content-Type': 'application/json'}
-            response = requests.post(url, json=body, headers=headers, verify=False)
+            response = get_session().request(method, url, verify=False, timeout=get_timeout(),
+                                             stream=settings.GATEWAY_PASSTHROUGH, **kwargs)
+            if response.status_code == status.HTTP_304_NOT_MODIFIED:
+                response.close()
+                return not_modified_response(response, passthrough=settings.GATEWAY_PASSTHROUGH)
+            if settings.GATEWAY_PASSTHROUGH:
+                raise_for_status(response)
+                return passthrough_response(response, asynchronous=isinstance(request._request, ASGIRequest))
+
             response.raise_for_status()
-            return Response(response.json(), status=response.status_code)
+            return copy_cache_headers(response, Response(response.json(), status=response.status_code))
         except requests.exceptions.RequestException as e:
             return Response(f'Error en la solicitud: {str(e)}', status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def put(self, request):
-        path, error_response = self.validate_and_extract_path(request)
-        if error_response:
-            return error_response
+    def get(self, request, subpath=None):
+        return self.proxy(request, 'GET', subpath)
 
-        request.data.pop('path')
-        body = request.data
-        url = f'{self.service_host}{path}'
+    def post(self, request, subpath=None):
+        return self.proxy(request, 'POST', subpath)
+
+    def put(self, request, subpath=None):
+        return self.proxy(request, 'PUT', subpath)
+
+    def delete(self, request, subpath=None):
+        return self.proxy(request, 'DELETE', subpath)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncGastosServiceView(View):
+    """
+    Versión asíncrona de GastosServiceView, que se usa bajo ASGI (GATEWAY_ASYNC, lo activa djangoProject/asgi.py).
+    Mientras espera al servicio no ocupa un thread, así un worker mantiene miles de requests en curso con
+    un único pool de conexiones. Las respuestas y los errores tienen el mismo formato que en GastosServiceView.
+    """
+    service_host = settings.HOST_GASTOS_SERVICE
+    serializer_class = GatewaySerializer
+    http_method_names = ['get', 'post', 'put', 'delete']
+
+    @staticmethod
+    def _response(data, status_code):
+        # mismo JSON que el JSONRenderer de DRF
+        return JsonResponse(data, status=status_code, safe=False,
+                            json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')})
+
+    def _prepare(self, request, subpath=None):
+        """
+        Autentica y valida el request con las clases de DRF, como GastosServiceView. En el modo forwarding
+        (path en la URL o en el header GATEWAY_PATH_HEADER) el cuerpo no se parsea (datos None).
+
+        :return: (path, datos del request, None) o (None, None, respuesta de error)
+        """
+        drf_request = Request(
+            request,
+            parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES],
+            authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+        )
         try:
-            headers = {'Content-Type': 'application/json'}
-            response = requests.put(url, json=body, headers=headers, verify=False)
-            response.raise_for_status()
-            return Response(response.json(), status=response.status_code)
-        except requests.exceptions.RequestException as e:
-            return Response(f'Error en la solicitud: {str(e)}', status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            if not drf_request.user.is_authenticated:
+                raise NotAuthenticated()
 
-    def delete(self, request):
-        path, error_response = self.validate_and_extract_path(request)
+            path = forward_path(request, subpath)
+            data = None if path is not None else drf_request.data
+            serializer = self.serializer_class(data={'path': path} if path is not None else data)
+            if not serializer.is_valid():
+                return None, None, self._response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+            if data is None:
+                return with_query_string(request, path), None, None
+            return data['path'], data, None
+
+        except APIException as e:
+            data = e.detail if isinstance(e.detail, (list, dict)) else {'detail': e.detail}
+            if isinstance(e, (NotAuthenticated, AuthenticationFailed)):
+                response = self._response(data, status.HTTP_401_UNAUTHORIZED)
+                response['WWW-Authenticate'] = drf_request.authenticators[0].authenticate_header(drf_request)
+                return None, None, response
+            return None, None, self._response(data, e.status_code)
+
+    def _prepare_in_thread(self, request, subpath=None):
+        # corre en un thread del executor, fuera del ciclo de request de django: como al empezar y terminar
+        # cada request, se cierran las conexiones a la base vencidas (CONN_MAX_AGE) o rotas
+        close_old_connections()
+        try:
+            return self._prepare(request, subpath)
+        finally:
+            close_old_connections()
+
+    async def _proxy(self, request, method, subpath=None):
+        # la autenticación y el parseo no dependen del thread: los requests en curso no esperan un único thread
+        path, data, error_response = await sync_to_async(self._prepare_in_thread, thread_sensitive=False)(
+            request, subpath
+        )
         if error_response:
             return error_response
 
-        request.data.pop('path')
-        body = request.data
+        if data is None:
+            # forwarding: el cuerpo del cliente se reenvía por bloques, sin parsearlo
+            kwargs = {'headers': upstream_headers(request, raw=True)}
+            try:
+                stream = body_stream(request)
+            except LengthRequired as e:
+                return self._response({'detail': e.detail}, e.status_code)
+            if stream is not None:
+                kwargs['content'] = _aiter_body(stream)
+        else:
+            body = None
+            if method != 'GET':
+                data.pop('path')
+                body = data
+            kwargs = {'json': body, 'headers': upstream_headers(request)}
+
         url = f'{self.service_host}{path}'
+        client = get_async_client()
+        upstream = client.build_request(method, url, extensions={'trace': connection_trace()}, **kwargs)
         try:
-            headers = {'Content-Type': 'application/json'}
-            response = requests.delete(url, json=body, headers=headers, verify=False)
+            gateway_metrics.record_request()
+            response = await client.send(upstream, stream=settings.GATEWAY_PASSTHROUGH)
+            if response.status_code == status.HTTP_304_NOT_MODIFIED:
+                # antes de raise_for_status, que en httpx también falla con los 3xx
+                await response.aclose()
+                return not_modified_response(response, passthrough=settings.GATEWAY_PASSTHROUGH)
+            if settings.GATEWAY_PASSTHROUGH:
+                if response.is_error:
+                    await response.aclose()
+                response.raise_for_status()
+                return passthrough_response(response)
+
             response.raise_for_status()
-            return Response(response.json(), status=response.status_code)
-        except requests.exceptions.RequestException as e:
-            return Response(f'Error en la solicitud: {str(e)}', status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return copy_cache_headers(response, self._response(response.json(), response.status_code))
+        except (httpx.HTTPError, ValueError) as e:
+            return self._response(f'Error en la solicitud: {str(e)}', status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    async def get(self, request, subpath=None):
+        return await self._proxy(request, 'GET', subpath)
+
+    async def post(self, request, subpath=None):
+        return await self._proxy(request, 'POST', subpath)
+
+    async def put(self, request, subpath=None):
+        return await self._proxy(request, 'PUT', subpath)
+
+    async def delete(self, request, subpath=None):
+        return await self._proxy(request, 'DELETE', subpath)
 
 
 class DocsGastosServiceView(GenericAPIView):
@@ -96,9 +416,25 @@ class DocsGastosServiceView(GenericAPIView):
 
         url = f'{self.service_host}swagger/v1/swagger.json'
         try:
-            response = requests.get(url, headers={'Content-Type': 'application/json'}, verify=False)
+            response = get_session().get(url, headers=upstream_headers(request), verify=False,
+                                         timeout=get_timeout(), stream=settings.GATEWAY_PASSTHROUGH)
+            if settings.GATEWAY_PASSTHROUGH:
+                raise_for_status(response)
+                return passthrough_response(response, asynchronous=isinstance(request._request, ASGIRequest))
+
             response.raise_for_status()
             return Response(response.json(), status=response.status_code)
         except requests.exceptions.RequestException as e:
             print(f"Error en la solicitud a {url}: {str(e)}")
             return Response(f'Error en la solicitud: {str(e)}', status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class GatewayMetricsView(GenericAPIView):
+    permission_classes = [IsAdminUser]
+    serializer_class = None
+
+    def get(self, request):
+        """
+        Requests del gateway en este proceso, conexiones nuevas y reutilizadas, y tiempo de conexión p50/p99.
+        """
+        return Response(gateway_metrics.stats())